@@ -37,3 +37,41 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+# Thin client of the resident service (python src/sync_service.py sync|status|stop):
+# standard library only, so that it starts at once on the device
+client_a = Analysis(
+    ['src/sync_service.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=0,
+)
+client_pyz = PYZ(client_a.pure)
+
+client_exe = EXE(
+    client_pyz,
+    client_a.scripts,
+    client_a.binaries,
+    client_a.datas,
+    [],
+    name='calendar_sync_client',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
@@ -1,16 +1,53 @@
 import os
+import json
 import pickle
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.exceptions import TransportError, RefreshError
 from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 import appdirs
+from google_event import GoogleEvent, LIST_FIELDS, execute_gzip
+from recurrence import get_google_events_expanded_locally
+from snapshot_manager import SNAPSHOT_DIR, ensure_snapshot_dir
+from time_utils import rfc3339_to_dotnet_ticks
 
 # Configuration
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 CALENDAR_ID = 'primary'
+# Calendar API batches accept at most 50 requests
+BATCH_SIZE = 50
+# Timeout of each HTTP request to Google (in seconds), so that a hanging
+# connection fails like a network error instead of blocking the sync
+HTTP_TIMEOUT = 30
+
+# Wide windows are fetched as time shards, concurrently
+MAX_FETCH_WORKERS = 4
+# Shards are sized so that they usually fit in one page of results
+TARGET_EVENTS_PER_SHARD = 200
+MIN_SHARD_DAYS = 7
+MAX_SHARD_DAYS = 31
+# Event density seen in earlier runs, used to size the shards
+FETCH_STATS_FILE = os.path.join(SNAPSHOT_DIR, 'fetch_stats.json')
+
+# Errors meaning that Google cannot be reached (no network, DNS failure, ...)
+NETWORK_ERRORS = (ConnectionError, TimeoutError, socket.gaierror,
+                  httplib2.ServerNotFoundError, TransportError)
+# Errors meaning that the stored credentials no longer work (expired or revoked token)
+AUTH_ERRORS = (RefreshError,)
+
+# Built once per process, so that a resident process keeps its credentials and connection
+_service = None
 
 def get_google_calendar_service():
     """Get authenticated Google Calendar service."""
+    global _service
+    if _service is not None:
+        return _service
     creds = None
     TOKEN_PATH = os.path.join(appdirs.user_data_dir("CalendarSync", roaming=True), 'token.pkl')
     print("token path: ", TOKEN_PATH)
@@ -25,9 +62,21 @@ def get_google_calendar_service():
         creds = flow.run_local_server(port=0)
         with open(TOKEN_PATH, 'wb') as token:
             pickle.dump(creds, token)
-    return build('calendar', 'v3', credentials=creds)
+    _service = build('calendar', 'v3', http=AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT)))
+    return _service
+
+def reset_google_calendar_service():
+    """
+    Forget the service built by get_google_calendar_service.
+
+    Called after authentication or network failures, so that a resident
+    process reads the credentials and connects again at its next sync
+    instead of failing until it is restarted.
+    """
+    global _service
+    _service = None
 
-def get_google_events(service, time_min=None, time_max=None):
+def get_google_events(service, time_min=None, time_max=None, http=None):
     """
     Get Google Calendar events within a specified time range.
     
@@ -35,6 +84,9 @@ def get_google_events(service, time_min=None, time_max=None):
         service: Google Calendar service object
         time_min: Minimum time for events (RFC3339 string), defaults to now
         time_max: Maximum time for events (RFC3339 string), optional
+        http: Connection to use instead of the service's one, optional
+
+    Returns a list of GoogleEvent records.
     """
     if time_min is None:
         time_min = datetime.now(timezone.utc).isoformat()
@@ -44,20 +96,136 @@ def get_google_events(service, time_min=None, time_max=None):
         'timeMin': time_min,
         'maxResults': 250,
         'singleEvents': True,
-        'orderBy': 'startTime'
+        'orderBy': 'startTime',
+        'fields': LIST_FIELDS
     }
     
     if time_max:
         params['timeMax'] = time_max
     
-    events_result = service.events().list(**params).execute()
-    return events_result.get('items', [])
+    events = []
+    while True:
+        events_result = execute_gzip(service.events().list(**params), http=http)
+        events.extend(GoogleEvent.from_item(item) for item in events_result.get('items', []))
+        params['pageToken'] = events_result.get('nextPageToken')
+        if not params['pageToken']:
+            return events
+
+def _load_events_per_day():
+    try:
+        with open(FETCH_STATS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)['events_per_day']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _save_events_per_day(events_per_day):
+    previous = _load_events_per_day()
+    if previous is not None:
+        # Smooth out one-off busy or empty windows
+        events_per_day = (previous + events_per_day) / 2
+    ensure_snapshot_dir()
+    with open(FETCH_STATS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({'events_per_day': events_per_day}, f)
+
+def get_shard_days():
+    """Shard size in days, adapted to the event density seen in earlier runs."""
+    events_per_day = _load_events_per_day()
+    if not events_per_day:
+        return MAX_SHARD_DAYS
+    return int(min(MAX_SHARD_DAYS, max(MIN_SHARD_DAYS, TARGET_EVENTS_PER_SHARD / events_per_day)))
+
+def get_google_events_sharded(service, time_min, time_max):
+    """
+    Get the events of a wide window by fetching time shards concurrently.
+
+    Each shard is a paginated list of its own, fetched on its own connection
+    since httplib2 connections are not thread-safe. Results are merged in start
+    time order; events overlapping a shard boundary are returned by both shards
+    and only kept once.
+    """
+    window_start = datetime.fromisoformat(time_min)
+    window_end = datetime.fromisoformat(time_max)
+    shard_length = timedelta(days=get_shard_days())
+
+    shards = []
+    shard_start = window_start
+    while shard_start < window_end:
+        shard_end = min(shard_start + shard_length, window_end)
+        shards.append((shard_start.isoformat(), shard_end.isoformat()))
+        shard_start = shard_end
 
-def get_events_past_week_to_next_month(service, fetch_days_past=7, fetch_days_future=30):
-    """Get events from specified days ago to specified days from now."""
+    if len(shards) == 1:
+        events = get_google_events(service, time_min=time_min, time_max=time_max)
+    else:
+        connections = {}
+        lock = threading.Lock()
+
+        def fetch_shard(shard):
+            with lock:
+                http = connections.get(threading.get_ident())
+                if http is None:
+                    http = AuthorizedHttp(service._http.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+                    connections[threading.get_ident()] = http
+            return get_google_events(service, time_min=shard[0], time_max=shard[1], http=http)
+
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(shards))) as executor:
+            shard_events = list(executor.map(fetch_shard, shards))
+
+        events = []
+        seen_ids = set()
+        for event in (event for shard in shard_events for event in shard):
+            if event.id not in seen_ids:
+                seen_ids.add(event.id)
+                events.append(event)
+        events.sort(key=lambda event: int(rfc3339_to_dotnet_ticks(event.start)))
+
+    window_days = (window_end - window_start).total_seconds() / 86400
+    if window_days > 0:
+        _save_events_per_day(len(events) / window_days)
+    return events
+
+def get_events_past_week_to_next_month(service, fetch_days_past=7, fetch_days_future=30,
+                                       expand_recurring_locally=False):
+    """
+    Get events from specified days ago to specified days from now.
+
+    With expand_recurring_locally, recurring masters and their exceptions are
+    fetched and cached instead of server-expanded instances, and occurrences are
+    expanded locally for the requested window only.
+    """
     now = datetime.now(timezone.utc)
     
     time_min = (now - timedelta(days=fetch_days_past)).isoformat()
     time_max = (now + timedelta(days=fetch_days_future)).isoformat()
+
+    if expand_recurring_locally:
+        items = get_google_events_expanded_locally(service, CALENDAR_ID, time_min, time_max)
+        return [GoogleEvent.from_item(item) for item in items]
         
-    return get_google_events(service, time_min=time_min, time_max=time_max) 
\ No newline at end of file
+    return get_google_events_sharded(service, time_min, time_max)
+
+def execute_batched(service, requests, batch_size=BATCH_SIZE):
+    """
+    Execute API requests in HTTP batches instead of one round trip each.
+
+    Returns a list of (response, exception) tuples in the order of the requests.
+    If the network goes away, the requests not sent get the network error. A
+    request whose response never came back gets a ConnectionError, so that it
+    is retried rather than counted as done.
+    """
+    results = [(None, ConnectionError("No response received for this request"))] * len(requests)
+
+    def callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    for batch_start in range(0, len(requests), batch_size):
+        batch = service.new_batch_http_request(callback=callback)
+        for index in range(batch_start, min(batch_start + batch_size, len(requests))):
+            batch.add(requests[index], request_id=str(index))
+        try:
+            batch.execute()
+        except NETWORK_ERRORS as e:
+            for index in range(batch_start, len(requests)):
+                results[index] = (None, e)
+            break
+    return results
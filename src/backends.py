@@ -0,0 +1,212 @@
+import time
+import uuid
+from typing import Protocol
+from auth import CALENDAR_ID, execute_batched, get_google_events_sharded
+from google_event import GoogleEvent, CHANGES_FIELDS, GOOGLE_EVENT_FIELDS, execute_gzip
+from event_manager import build_google_event_body
+from xml_handler import iter_local_xml, stream_appointments_to_xml
+from ics_handler import iter_ics_events, write_ics_events
+from time_utils import rfc3339_to_dotnet_ticks
+
+class CalendarBackend(Protocol):
+    """
+    A calendar the sync can read and write in bulk.
+
+    Events are listed in the backend's own form (GoogleEvent for Google, the
+    xml_handler dicts for files). Operations are dicts in a common form:
+    {'op': 'insert', 'event': <xml_handler dict>},
+    {'op': 'patch', 'event_id': ..., 'changes': {'description': ..., 'start': ..., ...}},
+    {'op': 'delete', 'event_id': ...}.
+Google also takes a ready event resource as 'body' instead of 'event' or
+'changes', e.g. for operations replayed from the outbox.
+
+    Capability flags tell the engine which bulk path is cheapest:
+    supports_batching (many operations cost about one round trip),
+    supports_sync_token (list_changes only returns what changed since a token),
+    supports_patch (events can be changed in place instead of deleted and added).
+    """
+    name: str
+    supports_batching: bool
+    supports_sync_token: bool
+    supports_patch: bool
+
+    def list_events(self, time_min, time_max):
+        """Events starting in [time_min, time_max] (RFC3339 strings)."""
+        ...
+
+    def list_changes(self, sync_token=None):
+        """
+        (changed events, ids of deleted events, next sync token).
+
+        Without a token, all events and no deletions. Backends without
+        supports_sync_token always do that and return None as the next token.
+        """
+        ...
+
+    def apply(self, operations):
+        """Apply operations, returning (result, exception) tuples in their order."""
+        ...
+
+def _starts_in(event_start, time_min, time_max):
+    return int(rfc3339_to_dotnet_ticks(time_min)) <= int(rfc3339_to_dotnet_ticks(event_start)) \
+        <= int(rfc3339_to_dotnet_ticks(time_max))
+
+def _apply_to_list(events, operations):
+    """Apply operations to a list of xml_handler dicts, in place."""
+    by_id = {event['id']: event for event in events}
+    numeric_ids = [int(event_id) for event_id in by_id if event_id.isdigit()]
+    next_id = max(numeric_ids) + 1 if numeric_ids else 1
+    results = []
+    for operation in operations:
+        if operation['op'] == 'insert':
+            event = dict(operation['event'], id=str(next_id))
+            next_id += 1
+            events.append(event)
+            by_id[event['id']] = event
+            results.append((event, None))
+        elif operation['event_id'] not in by_id:
+            results.append((None, KeyError(operation['event_id'])))
+        elif operation['op'] == 'patch':
+            event = by_id[operation['event_id']]
+            event.update(operation['changes'])
+            # Ticks read from the file would override the new start and end
+            if 'start' in operation['changes']:
+                event.pop('start_ticks', None)
+            if 'end' in operation['changes']:
+                event.pop('end_ticks', None)
+            results.append((event, None))
+        else:
+            events.remove(by_id.pop(operation['event_id']))
+            results.append((None, None))
+    return results
+
+class GoogleCalendarBackend:
+    """Google Calendar through the API, with HTTP batches and sync tokens."""
+
+    name = 'google'
+    supports_batching = True
+    supports_sync_token = True
+    supports_patch = True
+
+    def __init__(self, service, calendar_id=CALENDAR_ID):
+        self.service = service
+        self.calendar_id = calendar_id
+
+    def list_events(self, time_min, time_max):
+        return get_google_events_sharded(self.service, time_min, time_max)
+
+    def list_changes(self, sync_token=None):
+        events = []
+        deleted_ids = []
+        params = {'calendarId': self.calendar_id, 'singleEvents': True, 'showDeleted': True,
+                  'maxResults': 250, 'fields': CHANGES_FIELDS}
+        if sync_token:
+            params['syncToken'] = sync_token
+        page_token = None
+        while True:
+            response = execute_gzip(self.service.events().list(pageToken=page_token, **params))
+            for item in response.get('items', []):
+                # Deleted events come back as 'cancelled' tombstones
+                if item.get('status') == 'cancelled':
+                    deleted_ids.append(item['id'])
+                else:
+                    events.append(GoogleEvent.from_item(item))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return events, deleted_ids, response.get('nextSyncToken')
+
+    @staticmethod
+    def _body(operation):
+        """Event resource sent by an insert or a patch."""
+        if 'body' in operation:
+            return operation['body']
+        if operation['op'] == 'insert':
+            return build_google_event_body(operation['event'])
+        # Only the changed fields, in the form build_google_event_body gives them
+        changes = operation['changes']
+        body = {}
+        if 'description' in changes:
+            body['summary'] = changes['description']
+        for field in ('start', 'end'):
+            if field in changes:
+                body[field] = {'dateTime': changes[field], 'timeZone': 'Europe/Paris'}
+        return body
+
+    def _request(self, operation):
+        events = self.service.events()
+        if operation['op'] == 'insert':
+            return events.insert(calendarId=self.calendar_id, fields=GOOGLE_EVENT_FIELDS,
+                                 body=self._body(operation))
+        if operation['op'] == 'patch':
+            return events.patch(calendarId=self.calendar_id, eventId=operation['event_id'],
+                                body=self._body(operation), fields=GOOGLE_EVENT_FIELDS)
+        return events.delete(calendarId=self.calendar_id, eventId=operation['event_id'])
+
+    def apply(self, operations):
+        results = execute_batched(self.service, [self._request(operation) for operation in operations])
+        return [(GoogleEvent.from_item(response) if response else None, exception)
+                for response, exception in results]
+
+class XmlCalendarBackend:
+    """Communicator's Appointments.xml, rewritten once per apply()."""
+
+    name = 'xml'
+    supports_batching = True
+    supports_sync_token = False
+    supports_patch = True
+
+    def __init__(self, path):
+        self.path = path
+
+    def list_events(self, time_min, time_max):
+        return [event for event in iter_local_xml(self.path)
+                if _starts_in(event['start'], time_min, time_max)]
+
+    def list_changes(self, sync_token=None):
+        # No change feed: always everything
+        return list(iter_local_xml(self.path)), [], None
+
+    def apply(self, operations):
+        events = list(iter_local_xml(self.path))
+        results = _apply_to_list(events, operations)
+        stream_appointments_to_xml(events, self.path)
+        return results
+
+class IcsFileBackend:
+    """A local .ics file, e.g. exported from or synced to a CalDAV server."""
+
+    name = 'ics'
+    supports_batching = True
+    supports_sync_token = False
+    supports_patch = True
+
+    def __init__(self, path, uid_domain='calendar-sync'):
+        self.path = path
+        self.uid_domain = uid_domain
+
+    def list_events(self, time_min, time_max):
+        return [event for event in iter_ics_events(self.path)
+                if _starts_in(event['start'], time_min, time_max)]
+
+    def list_changes(self, sync_token=None):
+        # No change feed: always everything
+        return list(iter_ics_events(self.path)), [], None
+
+    def apply(self, operations):
+        events = list(iter_ics_events(self.path))
+        results = _apply_to_list(events, operations)
+        for operation, (event, _) in zip(operations, results):
+            if operation['op'] == 'insert':
+                event['id'] = f"{uuid.uuid4()}@{self.uid_domain}"
+        # UIDs are written back as they were read
+        write_ics_events(events, self.path, uid_domain=None)
+        return results
+
+def benchmark_backend(backend, time_min, time_max, repeat=3):
+    """Best time in seconds to list a window from a backend."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.list_events(time_min, time_max)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
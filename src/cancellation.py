@@ -0,0 +1,29 @@
+import time
+import threading
+
+# State of the sync in progress, shared with the thread asking it to stop
+_stop_requested = threading.Event()
+_deadline = None
+
+def start_sync(deadline_seconds=None):
+    """Start tracking a new sync, which should stop after deadline_seconds."""
+    _stop_requested.clear()
+    start_deadline(deadline_seconds)
+
+def start_deadline(deadline_seconds):
+    """Stop the sync in progress deadline_seconds from now, or never if None or 0."""
+    global _deadline
+    _deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+
+def request_stop():
+    """Ask the sync in progress to stop at its next checkpoint (thread-safe)."""
+    _stop_requested.set()
+
+def is_cancelled():
+    """Checkpoint: whether the sync should stop now."""
+    return _stop_requested.is_set() or (_deadline is not None and time.monotonic() > _deadline)
+
+def cancel_reason():
+    if _stop_requested.is_set():
+        return "à la demande"
+    return "délai dépassé"
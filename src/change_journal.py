@@ -0,0 +1,151 @@
+import os
+import json
+from bisect import bisect_right
+from datetime import datetime, timezone
+from google_event import GoogleEvent
+from snapshot_manager import SNAPSHOT_DIR
+
+# Changes applied by each sync, for other tools to follow without rescanning
+JOURNAL_DIR = os.path.join(os.path.dirname(SNAPSHOT_DIR), 'journal')
+# A new segment file is started after this many entries
+SEGMENT_ENTRIES = 5000
+# Older segments are deleted beyond this many
+MAX_SEGMENTS = 20
+
+def _segment_path(first_sequence):
+    return os.path.join(JOURNAL_DIR, f'changes-{first_sequence:012d}.jsonl')
+
+def _segments():
+    """(first sequence, path) of the segment files, oldest first."""
+    if not os.path.isdir(JOURNAL_DIR):
+        return []
+    return sorted((int(name[len('changes-'):-len('.jsonl')]), os.path.join(JOURNAL_DIR, name))
+                  for name in os.listdir(JOURNAL_DIR)
+                  if name.startswith('changes-') and name.endswith('.jsonl'))
+
+def _read_segment(path):
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Partly written last line of an interrupted append
+                break
+    return entries
+
+def latest_sequence():
+    """Sequence number of the last entry, 0 if the journal is empty."""
+    segments = _segments()
+    if not segments:
+        return 0
+    first_sequence, path = segments[-1]
+    entries = _read_segment(path)
+    return entries[-1]['seq'] if entries else first_sequence - 1
+
+def oldest_sequence():
+    """
+    Sequence number of the oldest entry still in the journal.
+
+    A reader whose cursor is older than this missed compacted entries and
+    should rescan the calendar once.
+    """
+    segments = _segments()
+    return segments[0][0] if segments else latest_sequence() + 1
+
+def journal_entry(op, origin, event):
+    """
+    Journal entry for a change of a GoogleEvent or an XML event.
+
+    op is 'add', 'delete' or 'modify'; origin is the calendar the change was
+    made in ('google' or 'xml'), the other one being updated by the sync.
+    """
+    if isinstance(event, GoogleEvent):
+        event_id, title, start, end = event.id, event.summary, event.start, event.end
+    else:
+        event_id, title, start, end = event.get('id'), event.get('description'), event['start'], event['end']
+    return {'op': op, 'origin': origin, 'id': event_id, 'title': title, 'start': start, 'end': end}
+
+def append_changes(entries):
+    """
+    Append entries to the journal, numbering them after the last one.
+
+    Entries are written in one go and flushed to disk. Returns the sequence
+    number of the last entry.
+    """
+    sequence = latest_sequence()
+    if not entries:
+        return sequence
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    segments = _segments()
+    now = datetime.now(timezone.utc).isoformat()
+
+    rotated = False
+    lines_by_path = {}
+    current_path, current_count = None, 0
+    if segments:
+        current_path = segments[-1][1]
+        current_count = len(_read_segment(current_path))
+    for entry in entries:
+        sequence += 1
+        if current_path is None or current_count >= SEGMENT_ENTRIES:
+            rotated = current_path is not None
+            current_path, current_count = _segment_path(sequence), 0
+        line = json.dumps({'seq': sequence, 'time': now, **entry}, ensure_ascii=False)
+        lines_by_path.setdefault(current_path, []).append(line + '\n')
+        current_count += 1
+
+    for path, lines in lines_by_path.items():
+        with open(path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+    if rotated:
+        compact_journal()
+    return sequence
+
+def compact_journal(max_segments=None):
+    """
+    Shrink the closed segments of the journal.
+
+    Within a closed segment, an event added and deleted again on the same
+    side is dropped altogether: readers would end up where they started.
+    Sequence numbers are kept, so cursors stay valid. Then, the oldest
+    segments beyond max_segments are deleted.
+    """
+    max_segments = max_segments or MAX_SEGMENTS
+    segments = _segments()
+    for _, path in segments[:-1]:
+        entries = _read_segment(path)
+        added = {}
+        cancelled = set()
+        for entry in entries:
+            key = (entry['origin'], entry['title'], entry['start'])
+            if entry['op'] == 'add':
+                added[key] = entry['seq']
+            elif entry['op'] == 'delete' and key in added:
+                cancelled.update((added.pop(key), entry['seq']))
+        if cancelled:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    if entry['seq'] not in cancelled:
+                        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, path)
+    for _, path in segments[:max(0, len(segments) - max_segments)]:
+        os.remove(path)
+
+def read_changes(after=0):
+    """
+    Yield the entries with a sequence number greater than the cursor `after`.
+
+    Only the segments that can hold such entries are read, so following the
+    journal costs in proportion to the new changes.
+    """
+    segments = _segments()
+    first_sequences = [first_sequence for first_sequence, _ in segments]
+    start = max(0, bisect_right(first_sequences, after) - 1)
+    for _, path in segments[start:]:
+        for entry in _read_segment(path):
+            if entry['seq'] > after:
+                yield entry
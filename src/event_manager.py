@@ -1,12 +1,42 @@
-from auth import CALENDAR_ID
+import os
+from auth import CALENDAR_ID, execute_batched
 from xml_handler import write_appointments_to_xml
+from google_event import GoogleEvent, execute_gzip, sync_properties, LEGACY_SYNC_MARKER, XML_ID_PROPERTY
+from snapshot_manager import SNAPSHOT_DIR, ensure_snapshot_dir
+from matching import normalize_title
+from cancellation import is_cancelled
+
+# Written once the events created before tagging carry the sync properties
+TAG_MIGRATION_FILE = os.path.join(SNAPSHOT_DIR, 'sync_properties_migrated')
 
 def get_event_key(event, source='google'):
     """Generate a unique key for an event to track it across syncs."""
     if source == 'google':
-        return event.get('summary', '').strip()
+        return normalize_title(event.summary)
     else:  # xml
-        return event.get('description', '').strip()
+        return normalize_title(event.get('description', ''))
+
+def get_event_title(event):
+    """Return the title of a Google event (summary) or of an XML event (description)."""
+    if isinstance(event, GoogleEvent):
+        return event.summary.strip()
+    return (event.get('description') or '').strip()
+
+def build_google_event_body(xml_event):
+    """Build the Google Calendar event resource for an XML event."""
+    return {
+        'summary': xml_event['description'],
+        'start': {
+            'dateTime': xml_event['start'],
+            'timeZone': 'Europe/Paris',
+        },
+        'end': {
+            'dateTime': xml_event['end'],
+            'timeZone': 'Europe/Paris',
+        },
+        'description': f"{LEGACY_SYNC_MARKER} - ID {xml_event['id']}",
+        'extendedProperties': sync_properties(xml_event['id'])
+    }
 
 def detect_changes(current_events, previous_events, source='google'):
     """
@@ -25,32 +55,54 @@ def detect_changes(current_events, previous_events, source='google'):
     return added, deleted, modified
 
 def delete_google_events(service, events_to_delete):
-    """Delete events from Google Calendar."""
+    """
+    Delete events from Google Calendar.
+
+    Stops early if the sync is cancelled. Returns the events that were handled,
+    and the (event, deleted Google event) pairs of the events deleted.
+    """
+    handled = []
+    deleted = []
     for event in events_to_delete:
+        if is_cancelled():
+            break
+        handled.append(event)
         try:
-            # Extract title based on event source
             # XML events use 'description', Google events use 'summary'
-            title = event.get('description', '').strip() or event.get('summary', '').strip()
+            title = get_event_title(event)
             
             if not title:
                 print(f"⚠️ Cannot delete event with empty title: {event}")
                 continue
             
-            # Get current events to find the one to delete
-            events_result = service.events().list(
-                calendarId=CALENDAR_ID,
-                q=title,
-                maxResults=10
-            ).execute()
+            # Events created by the sync are found by the XML id they are tagged with
+            google_events = []
+            if isinstance(event, dict) and event.get('id'):
+                events_result = execute_gzip(service.events().list(
+                    calendarId=CALENDAR_ID,
+                    privateExtendedProperty=f"{XML_ID_PROPERTY}={event['id']}",
+                    maxResults=10,
+                    fields='items(id,summary)'
+                ))
+                google_events = [GoogleEvent.from_item(item) for item in events_result.get('items', [])]
             
-            google_events = events_result.get('items', [])
+            # Otherwise, search current events by title
+            if not google_events:
+                events_result = execute_gzip(service.events().list(
+                    calendarId=CALENDAR_ID,
+                    q=title,
+                    maxResults=10,
+                    fields='items(id,summary)'
+                ))
+                google_events = [GoogleEvent.from_item(item) for item in events_result.get('items', [])]
             
             for google_event in google_events:
-                if google_event.get('summary', '').strip() == title:
+                if normalize_title(google_event.summary) == normalize_title(title):
                     service.events().delete(
                         calendarId=CALENDAR_ID,
-                        eventId=google_event['id']
+                        eventId=google_event.id
                     ).execute()
+                    deleted.append((event, google_event))
                     print(f"🗑️ Deleted from Google Calendar: {title}")
                     break
             else:
@@ -58,15 +110,16 @@ def delete_google_events(service, events_to_delete):
                 
         except Exception as e:
             print(f"❌ Error deleting Google event '{title if 'title' in locals() else 'Unknown'}': {e}")
+    return handled, deleted
 
 def delete_xml_events(xml_events, events_to_delete, xml_path):
     """Remove events from XML list and rewrite the file."""
     # Extract titles properly from both Google events (summary) and XML events (description)
     titles_to_delete = set()
     for event in events_to_delete:
-        title = event.get('summary', '').strip() or event.get('description', '').strip()
+        title = get_event_title(event)
         if title:
-            titles_to_delete.add(title)
+            titles_to_delete.add(normalize_title(title))
             print(f"🔍 Looking to delete from XML: {title}")
     
     # Filter out events that should be deleted
@@ -75,7 +128,7 @@ def delete_xml_events(xml_events, events_to_delete, xml_path):
     
     for event in xml_events:
         xml_title = event.get('description', '').strip()
-        if xml_title in titles_to_delete:
+        if normalize_title(xml_title) in titles_to_delete:
             print(f"🗑️ Deleted from XML: {xml_title}")
             deleted_count += 1
         else:
@@ -88,4 +141,49 @@ def delete_xml_events(xml_events, events_to_delete, xml_path):
     else:
         print(f"ℹ️ No matching events found to delete from XML")
     
-    return remaining_events 
\ No newline at end of file
+    return remaining_events 
+
+def migrate_legacy_sync_markers(service):
+    """
+    Tag the events created before the sync used extended properties.
+
+    They are found with a full-text search for the description marker, and
+    patched in batches. Runs once: a marker file records that it is done.
+    Returns the number of events tagged.
+    """
+    if os.path.exists(TAG_MIGRATION_FILE):
+        return 0
+    
+    legacy_events = []
+    page_token = None
+    while True:
+        response = execute_gzip(service.events().list(
+            calendarId=CALENDAR_ID,
+            q=LEGACY_SYNC_MARKER,
+            pageToken=page_token,
+            maxResults=250,
+            fields='nextPageToken,items(id,description,extendedProperties/private)'
+        ))
+        for item in response.get('items', []):
+            event = GoogleEvent.from_item(item)
+            marker, _, xml_id = event.description.partition(f"{LEGACY_SYNC_MARKER} - ID ")
+            if event.xml_id is None and xml_id and not marker.strip():
+                legacy_events.append((event, xml_id.strip()))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    
+    if legacy_events:
+        print(f"🏷️ Marquage de {len(legacy_events)} événements déjà synchronisés...")
+    requests = [service.events().patch(calendarId=CALENDAR_ID, eventId=event.id, fields='id',
+                                       body={'extendedProperties': sync_properties(xml_id)})
+                for event, xml_id in legacy_events]
+    failures = [exception for _, exception in execute_batched(service, requests) if exception]
+    if failures:
+        print(f"⚠️ Could not tag {len(failures)} legacy events, will retry: {failures[0]}")
+        return len(legacy_events) - len(failures)
+    
+    ensure_snapshot_dir()
+    with open(TAG_MIGRATION_FILE, 'w', encoding='utf-8') as f:
+        f.write(str(len(legacy_events)))
+    return len(legacy_events)
@@ -0,0 +1,87 @@
+# Only the fields used by the sync are requested from the Calendar API
+GOOGLE_EVENT_FIELDS = 'id,summary,description,start,end,reminders,extendedProperties/private'
+LIST_FIELDS = f'nextPageToken,nextSyncToken,items({GOOGLE_EVENT_FIELDS})'
+# Incremental listings also return deleted events, as 'cancelled' tombstones
+CHANGES_FIELDS = f'nextPageToken,nextSyncToken,items(status,{GOOGLE_EVENT_FIELDS})'
+
+# Private extended properties set on the events created by the sync
+SYNC_SOURCE_PROPERTY = 'syncSource'
+XML_ID_PROPERTY = 'xmlId'
+# Description of the events created before they were tagged
+LEGACY_SYNC_MARKER = 'Synced from local XML'
+
+def sync_properties(xml_id):
+    """extendedProperties of an event created from the XML event xml_id."""
+    return {'private': {SYNC_SOURCE_PROPERTY: 'xml', XML_ID_PROPERTY: str(xml_id)}}
+
+class GoogleEvent:
+    """Compact record of a Google Calendar event, holding only what the sync uses."""
+
+    __slots__ = ('id', 'summary', 'description', 'start', 'end', 'reminder', 'xml_id')
+
+    def __init__(self, id, summary='', description='', start=None, end=None, reminder=False, xml_id=None):
+        self.id = id
+        self.summary = summary
+        self.description = description
+        self.start = start  # RFC3339 string, or YYYY-MM-DD for all-day events
+        self.end = end
+        self.reminder = reminder
+        self.xml_id = xml_id  # id of the XML event it was created from, if created by the sync
+
+    @classmethod
+    def from_item(cls, item):
+        """
+        Decode an event resource from the API, or a snapshot entry.
+
+        API resources carry nested start/end objects and a reminders object,
+        snapshot entries are already flattened by to_dict().
+        """
+        start = item.get('start') or {}
+        end = item.get('end') or {}
+        if isinstance(start, dict):
+            start = start.get('dateTime') or start.get('date')
+        if isinstance(end, dict):
+            end = end.get('dateTime') or end.get('date')
+
+        if 'reminder' in item:
+            reminder = item['reminder']
+        else:
+            reminders = item.get('reminders', {})
+            reminder = bool(reminders.get('useDefault', False) or reminders.get('overrides', []))
+
+        if 'xml_id' in item:
+            xml_id = item['xml_id']
+        else:
+            private = (item.get('extendedProperties') or {}).get('private') or {}
+            xml_id = private.get(XML_ID_PROPERTY) if private.get(SYNC_SOURCE_PROPERTY) == 'xml' else None
+
+        return cls(item.get('id'), item.get('summary') or '', item.get('description') or '',
+                   start, end, reminder, xml_id)
+
+    @property
+    def synced_from_xml(self):
+        """Whether the sync created this event from the XML calendar."""
+        return self.xml_id is not None or LEGACY_SYNC_MARKER in self.description
+
+    def to_dict(self):
+        """Flat representation used for snapshots."""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __eq__(self, other):
+        if not isinstance(other, GoogleEvent):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"GoogleEvent({self.id!r}, {self.summary!r}, start={self.start!r})"
+
+def execute_gzip(request, http=None):
+    """
+    Execute an API request asking for a gzip-compressed response.
+
+    http overrides the service's connection, e.g. to use one per thread.
+    """
+    # Google only compresses responses if the user agent also mentions gzip
+    request.headers['accept-encoding'] = 'gzip'
+    request.headers['user-agent'] = request.headers.get('user-agent', '') + ' (gzip)'
+    return request.execute(http=http)
@@ -0,0 +1,265 @@
+from datetime import datetime, date, timedelta, timezone
+from dateutil import rrule, tz
+from google_event import GoogleEvent
+
+# Time zone of floating (zone-less) times, same as the events sent to Google
+DEFAULT_TIMEZONE = 'Europe/Paris'
+# RFC 5545 content lines are folded at 75 octets
+MAX_LINE_OCTETS = 75
+# Recurring series are imported up to this many days ahead
+RECURRENCE_HORIZON_DAYS = 365
+# Properties defining the occurrences of a series, passed to dateutil as read
+RECURRENCE_PROPERTIES = ('RRULE', 'RDATE', 'EXDATE', 'EXRULE')
+
+def _unfold_lines(f):
+    """Yield the logical content lines of an iCalendar stream."""
+    current = None
+    for raw_line in f:
+        line = raw_line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+def _split_property(line):
+    """Split 'NAME;PARAM=VALUE:value' into (name, params, value)."""
+    name_part, _, value = line.partition(':')
+    name, *param_parts = name_part.split(';')
+    params = {}
+    for param in param_parts:
+        key, _, param_value = param.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+def _unescape_text(value):
+    return (value.replace('\\n', '\n').replace('\\N', '\n')
+            .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\'))
+
+def _escape_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+def _parse_ics_time(params, value):
+    """Parse a DTSTART/DTEND value into a timezone-aware datetime or a date."""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    # Sliced by hand: strptime dominates the import time of large files
+    dt = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                  int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    if value.endswith('Z'):
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.replace(tzinfo=tz.gettz(params.get('TZID', DEFAULT_TIMEZONE)) or tz.gettz(DEFAULT_TIMEZONE))
+
+def _parse_ics_duration(value):
+    """Parse the common forms of an iCalendar DURATION (e.g. PT1H30M, P1D)."""
+    sign = -1 if value.startswith('-') else 1
+    value = value.lstrip('+-').lstrip('P')
+    days_part, _, time_part = value.partition('T')
+    duration = timedelta()
+    number = ''
+    for char in days_part:
+        if char.isdigit():
+            number += char
+        else:
+            duration += timedelta(days=int(number) * (7 if char == 'W' else 1))
+            number = ''
+    units = {'H': 'hours', 'M': 'minutes', 'S': 'seconds'}
+    for char in time_part:
+        if char.isdigit():
+            number += char
+        else:
+            duration += timedelta(**{units[char]: int(number)})
+            number = ''
+    return sign * duration
+
+def _to_rfc3339(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc).isoformat()
+
+def _occurrence_key(value):
+    """Key identifying an occurrence by its original start, as Google does."""
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return value.strftime('%Y%m%d')
+
+def _xml_form(event):
+    return {
+        'id': event.get('id', ''),
+        'start': _to_rfc3339(event['start']),
+        'end': _to_rfc3339(event['end']),
+        'description': event.get('description', ''),
+        'reminder': event['reminder']
+    }
+
+def _expand_series(master, overrides, until):
+    """
+    Yield the occurrences of a recurring VEVENT up to until.
+
+    overrides maps occurrence keys to the VEVENTs (RECURRENCE-ID) replacing
+    them; a cancelled override removes its occurrence.
+    """
+    start = master['start']
+    duration = master['end'] - start
+    all_day = not isinstance(start, datetime)
+    # Like recurrence.py, all-day series are expanded on naive datetimes
+    dtstart = datetime(start.year, start.month, start.day) if all_day else start
+    limit = until.replace(tzinfo=None) if all_day else until
+    try:
+        rules = rrule.rrulestr('\n'.join(master['recurrence']), dtstart=dtstart, forceset=True)
+        occurrence_starts = rules.between(dtstart, limit, inc=True)
+        truncated = rules.after(limit) is not None
+    except (ValueError, TypeError) as e:
+        # e.g. a floating UNTIL or EXDATE in a series with a time zone
+        print(f"⚠️ Unreadable recurrence of '{master.get('description', '')}', "
+              f"only its first occurrence is imported: {e}")
+        yield master
+        return
+    if truncated:
+        print(f"⚠️ Series '{master.get('description', '')}' imported up to "
+              f"{until.date().isoformat()} only")
+    for occurrence_start in occurrence_starts:
+        if all_day:
+            occurrence_start = occurrence_start.date()
+        key = _occurrence_key(occurrence_start)
+        occurrence = overrides.pop(key, None) or dict(master, start=occurrence_start,
+                                                      end=occurrence_start + duration)
+        if not occurrence.get('cancelled'):
+            yield dict(occurrence, id=f"{master.get('id', '')}_{key}")
+    # Occurrences moved or added outside the rule
+    for key, override in overrides.items():
+        if not override.get('cancelled'):
+            yield dict(override, id=f"{master.get('id', '')}_{key}")
+
+def iter_ics_events(path, until=None):
+    """
+    Stream the VEVENTs of an .ics file as events in the xml_handler form.
+
+    One-off events are yielded as they are read, one at a time. The UID is
+    used as 'id'. Recurring series (RRULE, RDATE, EXDATE) and the occurrences
+    overriding them (RECURRENCE-ID) are held until the end of the file, then
+    expanded up to until, RECURRENCE_HORIZON_DAYS from now by default; each
+    occurrence gets the UID followed by its original start as 'id'.
+    """
+    if until is None:
+        until = datetime.now(timezone.utc) + timedelta(days=RECURRENCE_HORIZON_DAYS)
+    masters = {}
+    overrides = {}
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        event = None
+        in_alarm = False
+        for line in _unfold_lines(f):
+            name, params, value = _split_property(line)
+            if name == 'BEGIN' and value.upper() == 'VEVENT':
+                event = {'reminder': False}
+            elif event is None:
+                continue
+            elif in_alarm:
+                # Properties of the alarm (e.g. its own SUMMARY) are not the event's
+                in_alarm = not (name == 'END' and value.upper() == 'VALARM')
+            elif name == 'END' and value.upper() == 'VEVENT':
+                if 'start' in event:
+                    if 'end' not in event:
+                        duration = event.pop('duration', None)
+                        if duration is None:
+                            duration = timedelta(days=0 if isinstance(event['start'], datetime) else 1)
+                        event['end'] = event['start'] + duration
+                    event.pop('duration', None)
+                    if 'recurrence_id' in event:
+                        overrides.setdefault(event.get('id', ''), {})[event['recurrence_id']] = event
+                    elif 'recurrence' in event:
+                        masters[event.get('id', '')] = event
+                    else:
+                        yield _xml_form(event)
+                event = None
+            elif name == 'BEGIN' and value.upper() == 'VALARM':
+                event['reminder'] = True
+                in_alarm = True
+            elif name == 'UID':
+                event['id'] = value
+            elif name == 'SUMMARY':
+                event['description'] = _unescape_text(value)
+            elif name == 'DTSTART':
+                event['start'] = _parse_ics_time(params, value)
+            elif name == 'DTEND':
+                event['end'] = _parse_ics_time(params, value)
+            elif name == 'DURATION':
+                event['duration'] = _parse_ics_duration(value)
+            elif name in RECURRENCE_PROPERTIES:
+                event.setdefault('recurrence', []).append(line)
+            elif name == 'RECURRENCE-ID':
+                event['recurrence_id'] = _occurrence_key(_parse_ics_time(params, value))
+            elif name == 'STATUS':
+                event['cancelled'] = value.upper() == 'CANCELLED'
+
+    for uid, master in masters.items():
+        for occurrence in _expand_series(master, overrides.pop(uid, {}), until):
+            yield _xml_form(occurrence)
+    # Overridden occurrences of a series missing from the file
+    for series_overrides in overrides.values():
+        for override in series_overrides.values():
+            if not override.get('cancelled'):
+                yield _xml_form(override)
+
+def _fold_line(line):
+    """Fold a content line at 75 octets, without splitting UTF-8 sequences."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    limit = MAX_LINE_OCTETS
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = ''
+            limit = MAX_LINE_OCTETS - 1  # continuation lines start with a space
+        current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+def _format_ics_time(rfc3339_str):
+    """Format an RFC3339 string or an all-day date as an iCalendar value."""
+    if len(rfc3339_str) == 10:
+        return ';VALUE=DATE:' + rfc3339_str.replace('-', '')
+    dt = datetime.fromisoformat(rfc3339_str.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return ':' + dt.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+def write_ics_events(events, path, uid_domain='calendar-sync'):
+    """
+    Stream events to an .ics file.
+
+    Accepts XML events (xml_handler dicts) and GoogleEvent records, from any
+    iterable, so that exports never hold the whole calendar in memory. The
+    UID of XML events is their id at uid_domain, or just their id without it.
+    Returns the number of events written.
+    """
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//CalendarSync//Communicator//FR\r\n')
+        for event in events:
+            if isinstance(event, GoogleEvent):
+                uid, title = event.id, event.summary
+                start, end, reminder = event.start, event.end, event.reminder
+            else:
+                uid = f"{event['id']}@{uid_domain}" if uid_domain else event['id']
+                title = event['description'] or ''
+                start, end, reminder = event['start'], event['end'], event.get('reminder', False)
+            lines = ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{stamp}',
+                     'DTSTART' + _format_ics_time(start), 'DTEND' + _format_ics_time(end),
+                     f'SUMMARY:{_escape_text(title)}']
+            if reminder:
+                lines += ['BEGIN:VALARM', 'ACTION:DISPLAY', f'DESCRIPTION:{_escape_text(title)}',
+                          'TRIGGER:-PT10M', 'END:VALARM']
+            lines.append('END:VEVENT')
+            f.write(''.join(_fold_line(line) for line in lines))
+            count += 1
+        f.write('END:VCALENDAR\r\n')
+    return count
@@ -0,0 +1,91 @@
+import os
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from time_utils import rfc3339_to_dotnet_ticks, dotnet_ticks_to_rfc3339
+from snapshot_manager import SNAPSHOT_DIR
+
+# Pre-computed "what's next" feed, for Communicator's home page
+UPCOMING_FILE = os.path.join(os.path.dirname(SNAPSHOT_DIR), 'upcoming.json')
+UPCOMING_COUNT = 10
+
+def event_ticks(event):
+    """Return (start, end) .NET ticks of an XML event."""
+    start = event.get('start_ticks') or rfc3339_to_dotnet_ticks(event['start'])
+    end = event.get('end_ticks') or rfc3339_to_dotnet_ticks(event['end'])
+    return int(start), int(end)
+
+class IntervalIndex:
+    """
+    Events indexed by their [start, end) interval in .NET ticks.
+
+    Events are kept in a list sorted by start, so that range and next-N
+    queries are a bisection plus the results. Overlap queries also bisect:
+    an event overlapping [start, end) must start at or after
+    start - longest duration, so only that slice is scanned.
+    """
+
+    def __init__(self, events=()):
+        self._starts = []
+        self._entries = []  # (start, end, event), in the order of _starts
+        self._max_duration = 0
+        for event in events:
+            self.add(event)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, event):
+        """Add an XML event."""
+        start, end = event_ticks(event)
+        position = bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._entries.insert(position, (start, end, event))
+        self._max_duration = max(self._max_duration, end - start)
+
+    def remove(self, event):
+        """Remove an XML event previously added. Returns False if it was not indexed."""
+        start, _ = event_ticks(event)
+        position = bisect_left(self._starts, start)
+        while position < len(self._starts) and self._starts[position] == start:
+            if self._entries[position][2] is event:
+                del self._starts[position]
+                del self._entries[position]
+                return True
+            position += 1
+        return False
+
+    def starting_between(self, start, end):
+        """Events starting in [start, end)."""
+        return [entry[2] for entry in
+                self._entries[bisect_left(self._starts, start):bisect_left(self._starts, end)]]
+
+    def overlapping(self, start, end):
+        """Events overlapping [start, end). Zero-length events overlap at their start."""
+        first = bisect_left(self._starts, start - self._max_duration)
+        last = bisect_left(self._starts, max(end, start + 1))
+        return [event for event_start, event_end, event in self._entries[first:last]
+                if event_end > start or event_start == start]
+
+    def next_events(self, after, count):
+        """The first `count` events starting at or after `after`."""
+        first = bisect_left(self._starts, after)
+        return [entry[2] for entry in self._entries[first:first + count]]
+
+def write_upcoming_feed(index, count=UPCOMING_COUNT, path=None):
+    """Write the next events of the merged calendar to the upcoming feed."""
+    path = path or UPCOMING_FILE
+    now = datetime.now(timezone.utc).isoformat()
+    upcoming = [{
+        'start': dotnet_ticks_to_rfc3339(start),
+        'end': dotnet_ticks_to_rfc3339(end),
+        'description': event['description'],
+        'reminder': event.get('reminder', False)
+    } for event in index.next_events(int(rfc3339_to_dotnet_ticks(now)), count)
+      for start, end in [event_ticks(event)]]
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'generated': now, 'events': upcoming}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -1,14 +1,34 @@
-from datetime import datetime
-from auth import get_google_calendar_service, get_events_past_week_to_next_month, CALENDAR_ID
+from datetime import datetime, timedelta, timezone
+from auth import get_google_calendar_service, get_events_past_week_to_next_month, CALENDAR_ID, NETWORK_ERRORS
+from auth import AUTH_ERRORS, reset_google_calendar_service
+from auth import BATCH_SIZE
+from google_event import GoogleEvent, GOOGLE_EVENT_FIELDS, sync_properties
 from time_utils import filter_events_by_time_range
-from xml_handler import parse_local_xml, write_appointments_to_xml
-from time_utils import rfc3339_to_dotnet_ticks
-from snapshot_manager import save_snapshots, load_snapshots
-from event_manager import detect_changes, delete_google_events, delete_xml_events
-from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QPushButton
+from xml_handler import parse_local_xml, write_appointments_to_xml, iter_local_xml, stream_appointments_to_xml
+from ics_handler import iter_ics_events, write_ics_events
+from time_utils import rfc3339_to_dotnet_ticks, dotnet_ticks_to_rfc3339
+from snapshot_manager import save_snapshots, load_snapshots, has_snapshots
+from snapshot_manager import load_backfill_checkpoint, save_backfill_checkpoint
+from event_manager import detect_changes, delete_google_events, delete_xml_events, build_google_event_body
+from event_manager import migrate_legacy_sync_markers
+from sync_lock import run_single_flight, SyncLock
+from profiling import profile_phase, enable_profiling, start_profile_run, profile_summary
+from push_sync import watch_and_sync
+from sync_service import SyncService, DEFAULT_PORT
+from backends import GoogleCalendarBackend
+from outbox import has_pending_operations, flush_outbox, queue_google_operation, queue_xml_changes
+from interval_index import IntervalIndex, write_upcoming_feed
+from change_journal import append_changes, journal_entry
+from matching import MatchIndex, normalize_title, event_start_ticks
+from cancellation import start_sync, start_deadline, request_stop, is_cancelled, cancel_reason
+from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QPushButton, QMessageBox
 from PyQt5.QtCore import Qt, QRunnable
 from PyQt5 import QtCore
 import sys, os
+import time
+import hashlib
+import subprocess
+import argparse
 from PyQt5.QtWidgets import QTextEdit
 from PyQt5.QtCore import QObject, pyqtSignal, QThreadPool
 from appdirs import user_config_dir
@@ -27,6 +47,7 @@ QPushButton {
 LOCAL_XML_PATH = 'Appointments.xml'
 XML_PATHS_COMMUNICATOR = [r'C:\Users\phili\AppData\Roaming\Tobii Dynavox\Communicator\5\Users\Philippe prédiction\Settings\Calendar\Appointments.xml',
                           r'C:\Users\Philippe\AppData\Roaming\Tobii Dynavox\Communicator\5\Users\Philippe\Settings\Calendar\Appointments.xml']
+COMMUNICATOR_EXE = r'C:\Program Files (x86)\Tobii Dynavox\Communicator 5\Communicator.exe'
 config_dir = user_config_dir("CalendarSync", roaming=True)
 try:
     print("reading config from", os.path.join(config_dir, "config.ini"))
@@ -35,15 +56,48 @@ try:
     FETCH_DAYS_FUTURE = int(parser["DEFAULT"]["FETCH_DAYS_FUTURE"])
     FETCH_DAYS_PAST = int(parser["DEFAULT"]["FETCH_DAYS_PAST"])
     START_COMMUNICATOR = parser["DEFAULT"].get("START_COMMUNICATOR", "true").lower() == "true"
+    LOCAL_RECURRENCE_EXPANSION = parser["DEFAULT"].get("LOCAL_RECURRENCE_EXPANSION", "false").lower() == "true"
+    WATCH_ADDRESS = parser["DEFAULT"].get("WATCH_ADDRESS", "")
+    WATCH_PORT = int(parser["DEFAULT"].get("WATCH_PORT", "8765"))
+    PROGRESSIVE_SYNC = parser["DEFAULT"].get("PROGRESSIVE_SYNC", "false").lower() == "true"
+    NEAR_TERM_HOURS = int(parser["DEFAULT"].get("NEAR_TERM_HOURS", "48"))
+    MATCH_SIMILARITY = float(parser["DEFAULT"].get("MATCH_SIMILARITY", "0.7"))
+    MATCH_SLOT_MINUTES = int(parser["DEFAULT"].get("MATCH_SLOT_MINUTES", "30"))
+    BACKFILL_CHUNK_DAYS = int(parser["DEFAULT"].get("BACKFILL_CHUNK_DAYS", "7"))
+    SYNC_DEADLINE_SECONDS = int(parser["DEFAULT"].get("SYNC_DEADLINE_SECONDS", "120"))
+    BACKGROUND_SYNC = parser["DEFAULT"].get("BACKGROUND_SYNC", "false").lower() == "true"
+    SERVICE_PORT = int(parser["DEFAULT"].get("SERVICE_PORT", str(DEFAULT_PORT)))
 except Exception as ex:
     print("Did not manage to parse config file: ", str(ex))
     FETCH_DAYS_FUTURE = 1
     FETCH_DAYS_PAST = 1
     START_COMMUNICATOR = True
+    LOCAL_RECURRENCE_EXPANSION = False
+    WATCH_ADDRESS = ""
+    WATCH_PORT = 8765
+    PROGRESSIVE_SYNC = False
+    NEAR_TERM_HOURS = 48
+    MATCH_SIMILARITY = 0.7
+    MATCH_SLOT_MINUTES = 30
+    BACKFILL_CHUNK_DAYS = 7
+    SYNC_DEADLINE_SECONDS = 120
+    BACKGROUND_SYNC = False
+    SERVICE_PORT = DEFAULT_PORT
     parser = configparser.ConfigParser()
     parser["DEFAULT"] = {"FETCH_DAYS_FUTURE": str(FETCH_DAYS_FUTURE),
                          "FETCH_DAYS_PAST": str(FETCH_DAYS_PAST),
-                         "START_COMMUNICATOR": str(START_COMMUNICATOR)}
+                         "START_COMMUNICATOR": str(START_COMMUNICATOR),
+                         "LOCAL_RECURRENCE_EXPANSION": str(LOCAL_RECURRENCE_EXPANSION),
+                         "WATCH_ADDRESS": WATCH_ADDRESS,
+                         "WATCH_PORT": str(WATCH_PORT),
+                         "PROGRESSIVE_SYNC": str(PROGRESSIVE_SYNC),
+                         "NEAR_TERM_HOURS": str(NEAR_TERM_HOURS),
+                         "MATCH_SIMILARITY": str(MATCH_SIMILARITY),
+                         "MATCH_SLOT_MINUTES": str(MATCH_SLOT_MINUTES),
+                         "BACKFILL_CHUNK_DAYS": str(BACKFILL_CHUNK_DAYS),
+                         "SYNC_DEADLINE_SECONDS": str(SYNC_DEADLINE_SECONDS),
+                         "BACKGROUND_SYNC": str(BACKGROUND_SYNC),
+                         "SERVICE_PORT": str(SERVICE_PORT)}
     print("Creating config file")
     with open(os.path.join(config_dir, "config.ini"), "w") as f:
         parser.write(f)
@@ -68,7 +122,7 @@ def sync_xml_to_google(service, local_events, google_events):
         local_events, FETCH_DAYS_PAST, FETCH_DAYS_FUTURE
     )
         
-    google_event_titles = {e.get('summary', ''): e for e in google_events}
+    google_event_titles = {e.summary: e for e in google_events}
     for local_event in filtered_local_events:
         title = local_event['description']
         if title not in google_event_titles:
@@ -83,6 +137,7 @@ def sync_xml_to_google(service, local_events, google_events):
                     'timeZone': 'Europe/Paris',
                 },
                 'description': f"Synced from local XML - ID {local_event['id']}",
+                'extendedProperties': sync_properties(local_event['id']),
                 # Add reminder if the local event has reminder set
                 'reminders': {
                     'useDefault': False,
@@ -91,7 +146,9 @@ def sync_xml_to_google(service, local_events, google_events):
                     ] if local_event.get('reminder', False) else []
                 }
             }
-            created = service.events().insert(calendarId=CALENDAR_ID, body=event_body).execute()
+            created = service.events().insert(
+                calendarId=CALENDAR_ID, body=event_body, fields=GOOGLE_EVENT_FIELDS
+            ).execute()
             print(f"✅ Evénement créé: {created['summary']} à {created['start']['dateTime']}")
         else:
             print(f"🔁 Evénement déjà existant: {title}")
@@ -108,11 +165,10 @@ def sync_google_to_xml(google_events, local_events, xml_path):
     new_appointments = []
     
     for google_event in google_events:
-        summary = google_event.get('summary', '').strip()
-        description = google_event.get('description', '')
+        summary = google_event.summary.strip()
         
         # Skip events that were synced from local XML (to avoid duplicates)
-        if "Synced from local XML" in description:
+        if google_event.synced_from_xml:
             continue
             
         # Skip if this event already exists in local XML
@@ -120,13 +176,9 @@ def sync_google_to_xml(google_events, local_events, xml_path):
             print(f"🔁 Evénement déjà existant dans le calendrier local : {summary}")
             continue
         
-        # Extract start and end times
-        start_time = google_event.get('start', {})
-        end_time = google_event.get('end', {})
-        
-        # Handle both dateTime and date fields
-        start_datetime = start_time.get('dateTime') or start_time.get('date')
-        end_datetime = end_time.get('dateTime') or end_time.get('date')
+        # Start and end are dateTime, or date for all-day events
+        start_datetime = google_event.start
+        end_datetime = google_event.end
         
         if not start_datetime or not end_datetime:
             print(f"⚠️ Événement sans date/heure: {summary}")
@@ -136,18 +188,12 @@ def sync_google_to_xml(google_events, local_events, xml_path):
         start_ticks = rfc3339_to_dotnet_ticks(start_datetime)
         end_ticks = rfc3339_to_dotnet_ticks(end_datetime)
         
-        # Check if Google event has any reminders
-        has_reminder = False
-        reminders = google_event.get('reminders', {})
-        if reminders.get('useDefault', False) or reminders.get('overrides', []):
-            has_reminder = True
-            
         new_appointments.append({
             'id': str(next_id),
             'start_ticks': start_ticks,
             'end_ticks': end_ticks,
             'description': summary,
-            'reminder': has_reminder  # True if Google event has reminders
+            'reminder': google_event.reminder  # True if Google event has reminders
         })
         
         print(f"📅 Nouveau rendez-vous depuis Google: {summary}")
@@ -164,119 +210,619 @@ def sync_google_to_xml(google_events, local_events, xml_path):
 # SYNC LOGIC - DIFF-BASED SYNC (ADDITIONS AND DELETIONS)
 # ============================================================================
 
-def sync_calendar_with_diff():
-    """Perform diff-based calendar synchronization that handles additions and deletions."""
-    service = get_google_calendar_service()
-    
-    current_xml_events = parse_local_xml(XML_PATH)
-    current_google_events = get_events_past_week_to_next_month(service, FETCH_DAYS_PAST, FETCH_DAYS_FUTURE)
-    
-    # Filter XML events to same time range
+def sync_xml_offline(current_xml_events):
+    """Record local XML changes in the outbox while Google Calendar is unreachable."""
     filtered_xml_events = filter_events_by_time_range(
         current_xml_events, FETCH_DAYS_PAST, FETCH_DAYS_FUTURE
     )
-    
-    # Load previous snapshots
     prev_google_events, prev_xml_events = load_snapshots()
+    if not prev_google_events and not prev_xml_events:
+        # Without a previous sync we cannot tell which events Google already has
+        print("❌ Aucune synchronisation précédente, impossible de synchroniser hors ligne")
+        return {'offline': True, 'cancelled': False, 'xml_added': 0, 'xml_deleted': 0}
     
-    # Detect changes
-    google_added, google_deleted, _ = detect_changes(current_google_events, prev_google_events, 'google')
     xml_added, xml_deleted, _ = detect_changes(filtered_xml_events, prev_xml_events, 'xml')
+    queue_xml_changes(xml_added, xml_deleted, prev_google_events)
+    
+    # Google changes are unknown until the network is back: keep its snapshot as is
+    save_snapshots(prev_google_events, filtered_xml_events)
+    write_upcoming_feed(IntervalIndex(current_xml_events))
+    return {'offline': True, 'cancelled': False, 'xml_added': len(xml_added), 'xml_deleted': len(xml_deleted)}
+
+def add_xml_events_to_google(service, xml_added, current_google_events):
+    """
+    Apply XML additions to Google Calendar.
+
+    Stops early if the sync is cancelled. Returns the events that were handled,
+    and the (XML event, created Google event) pairs of the events inserted.
+    """
+    print(f"\n📤 Ajout de {len(xml_added)} événements du calendrier local  au calendrier Google...")
+    google_matches = MatchIndex(current_google_events, MATCH_SIMILARITY, MATCH_SLOT_MINUTES)
+    handled = []
+    inserted = []
+    for event in xml_added:
+        if is_cancelled():
+            break
+        handled.append(event)
+        title = event['description']
+        if google_matches.find(title, event_start_ticks(event)) is None:
+            event_body = build_google_event_body(event)
+            try:
+                created = service.events().insert(
+                    calendarId=CALENDAR_ID, body=event_body, fields=GOOGLE_EVENT_FIELDS
+                ).execute()
+                inserted.append((event, GoogleEvent.from_item(created)))
+                print(f"✅ Ajouté au calendrier Google: {created.get('summary', '')}")
+            except NETWORK_ERRORS:
+                queue_google_operation('insert', title, body=event_body)
+            except Exception as e:
+                print(f"❌ Échec de l'ajout au calendrier Google: {title} - {e}")
+    return handled, inserted
+
+def add_google_events_to_xml(google_added, current_xml_events, xml_index=None):
+    """
+    Apply Google additions to the XML calendar, extending current_xml_events.
+
+    With xml_index (an IntervalIndex of current_xml_events), additions that
+    overlap existing appointments are reported, and added to the index.
+    If the sync is cancelled, the events added so far are still written.
+    Returns the events that were handled, and the (Google event, XML row)
+    pairs of the rows written.
+    """
+    print(f"\n📥 Ajout de {len(google_added)} événements du calendrier Google au calendrier local...")
+    xml_matches = MatchIndex(current_xml_events, MATCH_SIMILARITY, MATCH_SLOT_MINUTES)
+    existing_ids = [int(event['id']) for event in current_xml_events if event['id'].isdigit()]
+    next_id = max(existing_ids) + 1 if existing_ids else 1
     
-    # Apply changes: XML additions → Google Calendar
-    if xml_added:
-        print(f"\n📤 Ajout de {len(xml_added)} événements du calendrier local  au calendrier Google...")
-        google_event_titles = {e.get('summary', ''): e for e in current_google_events}
-        for event in xml_added:
-            title = event['description']
-            if title not in google_event_titles:
-                try:
-                    event_body = {
-                        'summary': event['description'],
-                        'start': {
-                            'dateTime': event['start'],
-                            'timeZone': 'Europe/Paris',
-                        },
-                        'end': {
-                            'dateTime': event['end'],
-                            'timeZone': 'Europe/Paris',
-                        },
-                        'description': f"Synced from local XML - ID {event['id']}"
-                    }
-                    created = service.events().insert(calendarId=CALENDAR_ID, body=event_body).execute()
-                    print(f"✅ Ajouté au calendrier Google: {created.get('summary', '')}")
-                except Exception as e:
-                    print(f"❌ Échec de l'ajout au calendrier Google: {title} - {e}")
-    
-    # Apply changes: Google additions → XML
-    if google_added:
-        print(f"\n📥 Ajout de {len(google_added)} événements du calendrier Google au calendrier local...")
-        xml_descriptions = {event['description'].strip() for event in current_xml_events}
-        existing_ids = [int(event['id']) for event in current_xml_events if event['id'].isdigit()]
-        next_id = max(existing_ids) + 1 if existing_ids else 1
+    new_xml_events = []
+    handled = []
+    written = []
+    for event in google_added:
+        if is_cancelled():
+            break
+        handled.append(event)
+        summary = event.summary.strip()
         
-        new_xml_events = []
-        for event in google_added:
-            summary = event.get('summary', '').strip()
-            description = event.get('description', '')
-            
-            # Skip if already exists or was synced from XML
-            if summary in xml_descriptions or "Synced from local XML" in description:
-                continue
-            
-            # Extract start and end times
-            start_time = event.get('start', {})
-            end_time = event.get('end', {})
-            start_datetime = start_time.get('dateTime') or start_time.get('date')
-            end_datetime = end_time.get('dateTime') or end_time.get('date')
-            
-            if start_datetime and end_datetime:
-                new_xml_events.append({
-                    'id': str(next_id),
-                    'start_ticks': rfc3339_to_dotnet_ticks(start_datetime),
-                    'end_ticks': rfc3339_to_dotnet_ticks(end_datetime),
-                    'description': summary,
-                    'reminder': False
-                })
-                print(f"✅ Ajouté au calendrier local: {summary}")
-                next_id += 1
+        # Skip if already exists or was synced from XML
+        if event.synced_from_xml or xml_matches.find(summary, event_start_ticks(event)) is not None:
+            continue
         
-        if new_xml_events:
-            write_appointments_to_xml(current_xml_events + new_xml_events, XML_PATH)
-            current_xml_events.extend(new_xml_events)
-    
-    # Handle deletions: XML deletions → Google Calendar
-    if xml_deleted:
-        print(f"\n🗑️ Suppression de {len(xml_deleted)} événements du calendrier Google...")
-        for event in xml_deleted:
-            print(f"Suppression de l'événement {event.get('summary', '')} du calendrier Google")
-        delete_google_events(service, xml_deleted)
-    
-    # Handle deletions: Google deletions → XML  
-    if google_deleted:
-        print(f"\n🗑️ Suppression de {len(google_deleted)} événements du calendrier local...")
-        for event in google_deleted:
-            print(f"Suppression de l'événement {event.get('summary', '')} du calendrier local")
-        current_xml_events = delete_xml_events(current_xml_events, google_deleted, XML_PATH)
-    
-    # Refresh current states after all changes
-    final_google_events = get_events_past_week_to_next_month(service, FETCH_DAYS_PAST, FETCH_DAYS_FUTURE)
-    final_xml_events = parse_local_xml(XML_PATH)
-    
-    # Filter XML events again for snapshot
-    final_filtered_xml = filter_events_by_time_range(
-        final_xml_events, FETCH_DAYS_PAST, FETCH_DAYS_FUTURE
-    )
+        start_datetime = event.start
+        end_datetime = event.end
+        
+        if start_datetime and end_datetime:
+            start_ticks = rfc3339_to_dotnet_ticks(start_datetime)
+            end_ticks = rfc3339_to_dotnet_ticks(end_datetime)
+            # Same form as the rows read by iter_local_xml
+            new_event = {
+                'id': str(next_id),
+                'start': dotnet_ticks_to_rfc3339(start_ticks),
+                'end': dotnet_ticks_to_rfc3339(end_ticks),
+                'start_ticks': start_ticks,
+                'end_ticks': end_ticks,
+                'description': summary,
+                'reminder': False
+            }
+            if xml_index is not None:
+                conflicts = xml_index.overlapping(int(new_event['start_ticks']), int(new_event['end_ticks']))
+                if conflicts:
+                    titles = ', '.join(conflict['description'] for conflict in conflicts)
+                    print(f"⚠️ {summary} chevauche: {titles}")
+                xml_index.add(new_event)
+            new_xml_events.append(new_event)
+            written.append((event, new_event))
+            print(f"✅ Ajouté au calendrier local: {summary}")
+            next_id += 1
+    
+    if new_xml_events:
+        write_appointments_to_xml(current_xml_events + new_xml_events, XML_PATH)
+        current_xml_events.extend(new_xml_events)
+    return handled, written
+
+def google_event_id(event):
+    return event.id
+
+def xml_event_id(event):
+    return event['id']
+
+def apply_to_snapshot(previous_events, added, deleted, key):
+    """
+    Snapshot entries once the given additions and deletions are applied.
+
+    Events are matched by key(event): deleted events may be other objects than
+    the previous ones, e.g. read again from the calendar.
+    """
+    deleted_keys = {key(event) for event in deleted}
+    return [event for event in previous_events if key(event) not in deleted_keys] + list(added)
+
+def split_by_time_range(events, fetch_days_past, fetch_days_future):
+    """Split events into those within the time range and the others."""
+    inside = filter_events_by_time_range(events, fetch_days_past, fetch_days_future)
+    inside_ids = {id(event) for event in inside}
+    return inside, [event for event in events if id(event) not in inside_ids]
+
+def journal_applied_changes(applied):
+    """
+    Append the changes applied by a sync to the change journal.
+
+    applied holds the (changed event, event written or removed on the other
+    side) pairs of the sync: changes skipped as already synced, queued while
+    offline or failed are not journaled.
+    """
+    entries = []
+    for key, op, origin in (('xml_added', 'add', 'xml'), ('google_added', 'add', 'google'),
+                            ('xml_deleted', 'delete', 'xml'), ('google_deleted', 'delete', 'google')):
+        journaled = set()
+        for event, _ in applied[key]:
+            # A Google deletion may remove several XML rows with its title
+            if event is not None and id(event) not in journaled:
+                journaled.add(id(event))
+                entries.append(journal_entry(op, origin, event))
+    try:
+        append_changes(entries)
+    except OSError as e:
+        print(f"⚠️ Impossible d'écrire le journal des changements: {e}")
+
+def sync_calendar_with_diff(use_sync_token=None, window=None):
+    """
+    Perform diff-based calendar synchronization that handles additions and deletions.
+
+    With use_sync_token, Google events come from the local event cache, which is
+    updated with the stored sync token (see recurrence.py). Defaults to the
+    LOCAL_RECURRENCE_EXPANSION setting.
+
+    window is a (days past, days future) slice of the configured period to sync
+    on its own; days past is negative for slices starting in the future. Only
+    the part of the snapshots within the slice is compared and replaced, the
+    rest is kept for the next sync of the full period.
+
+    The sync stops at its next checkpoint once cancelled (see cancellation.py).
+    Changes applied until then are kept and recorded in the snapshots, the
+    others are detected again at the next sync.
+
+    Returns a summary with the number of changes detected on each side.
+    """
+    if use_sync_token is None:
+        use_sync_token = LOCAL_RECURRENCE_EXPANSION
+    days_past, days_future = window or (FETCH_DAYS_PAST, FETCH_DAYS_FUTURE)
+
+    with profile_phase('fetch'):
+        current_xml_events = parse_local_xml(XML_PATH)
+        
+        try:
+            service = get_google_calendar_service()
+            # Replay changes queued while offline before looking at Google's state
+            if has_pending_operations():
+                flush_outbox(service)
+            # Once: tag the events synced before extended properties were used
+            migrate_legacy_sync_markers(service)
+            current_google_events = get_events_past_week_to_next_month(
+                service, days_past, days_future, use_sync_token
+            )
+        except NETWORK_ERRORS as e:
+            print(f"📴 Calendrier Google injoignable ({e}), synchronisation hors ligne")
+            reset_google_calendar_service()
+            return sync_xml_offline(current_xml_events)
+    
+    if is_cancelled():
+        print(f"⏹️ Synchronisation arrêtée ({cancel_reason()}) avant tout changement")
+        return {'offline': False, 'cancelled': True,
+                'google_added': 0, 'google_deleted': 0, 'xml_added': 0, 'xml_deleted': 0}
+    
+    with profile_phase('diff'):
+        # Filter XML events to same time range
+        filtered_xml_events = filter_events_by_time_range(
+            current_xml_events, days_past, days_future
+        )
+        
+        # Load previous snapshots
+        prev_google_events, prev_xml_events = load_snapshots()
+        outside_google_events, outside_xml_events = [], []
+        if window:
+            prev_google_events, outside_google_events = split_by_time_range(
+                prev_google_events, days_past, days_future
+            )
+            prev_xml_events, outside_xml_events = split_by_time_range(
+                prev_xml_events, days_past, days_future
+            )
+        
+        # Detect changes
+        google_added, google_deleted, _ = detect_changes(current_google_events, prev_google_events, 'google')
+        xml_added, xml_deleted, _ = detect_changes(filtered_xml_events, prev_xml_events, 'xml')
+        
+        # Kept up to date with the changes applied to the XML calendar
+        xml_index = IntervalIndex(current_xml_events)
+    
+    with profile_phase('apply'):
+        # Changes handled so far, recorded in the snapshots if the sync stops early
+        done = {'xml_added': [], 'google_added': [], 'xml_deleted': [], 'google_deleted': []}
+        # For each of them, (changed event, event written or removed on the other side) pairs
+        applied = {'xml_added': [], 'google_added': [], 'xml_deleted': [], 'google_deleted': []}
+        
+        # Apply changes: XML additions → Google Calendar
+        if xml_added and not is_cancelled():
+            done['xml_added'], applied['xml_added'] = add_xml_events_to_google(
+                service, xml_added, current_google_events
+            )
+        
+        # Apply changes: Google additions → XML
+        if google_added and not is_cancelled():
+            done['google_added'], applied['google_added'] = add_google_events_to_xml(
+                google_added, current_xml_events, xml_index
+            )
+        
+        # Handle deletions: XML deletions → Google Calendar
+        if xml_deleted and not is_cancelled():
+            print(f"\n🗑️ Suppression de {len(xml_deleted)} événements du calendrier Google...")
+            for event in xml_deleted:
+                print(f"Suppression de l'événement {event.get('summary', '')} du calendrier Google")
+            done['xml_deleted'], applied['xml_deleted'] = delete_google_events(service, xml_deleted)
+        
+        # Handle deletions: Google deletions → XML  
+        if google_deleted and not is_cancelled():
+            print(f"\n🗑️ Suppression de {len(google_deleted)} événements du calendrier local...")
+            for event in google_deleted:
+                print(f"Suppression de l'événement {event.summary} du calendrier local")
+            remaining_xml_events = delete_xml_events(current_xml_events, google_deleted, XML_PATH)
+            remaining_ids = {id(event) for event in remaining_xml_events}
+            deleted_by_title = {normalize_title(event.summary): event for event in google_deleted}
+            for event in current_xml_events:
+                if id(event) not in remaining_ids:
+                    xml_index.remove(event)
+                    deleted_event = deleted_by_title.get(normalize_title(event['description']))
+                    applied['google_deleted'].append((deleted_event, event))
+            current_xml_events = remaining_xml_events
+            done['google_deleted'] = google_deleted
+        
+        journal_applied_changes(applied)
+    
+    if is_cancelled():
+        # Skip the final fetch: the snapshots are the previous ones plus what was applied
+        print(f"⏹️ Synchronisation arrêtée ({cancel_reason()}), "
+              "les changements restants seront faits à la prochaine synchronisation")
+        # Changes made in each calendar, and what the sync wrote to or removed from the other one
+        google_snapshot = apply_to_snapshot(
+            prev_google_events,
+            done['google_added'] + [created for _, created in applied['xml_added']],
+            done['google_deleted'] + [removed for _, removed in applied['xml_deleted']],
+            google_event_id
+        )
+        # XML ids are reused: the rows the user deleted are dropped before adding the new rows
+        xml_snapshot = apply_to_snapshot(
+            apply_to_snapshot(prev_xml_events, done['xml_added'], done['xml_deleted'], xml_event_id)
+            + [written for _, written in applied['google_added']],
+            [],
+            [removed for _, removed in applied['google_deleted']],
+            xml_event_id
+        )
+        save_snapshots(outside_google_events + google_snapshot, outside_xml_events + xml_snapshot)
+        write_upcoming_feed(xml_index)
+        return {'offline': False, 'cancelled': True,
+                **{key: len(events) for key, events in done.items()}}
     
-    # Save snapshots for next sync
-    save_snapshots(final_google_events, final_filtered_xml)
+    with profile_phase('snapshot'):
+        # Refresh current states after all changes
+        final_google_events = get_events_past_week_to_next_month(
+            service, days_past, days_future, use_sync_token
+        )
+        final_xml_events = parse_local_xml(XML_PATH)
+        
+        # Filter XML events again for snapshot
+        final_filtered_xml = filter_events_by_time_range(
+            final_xml_events, days_past, days_future
+        )
+        
+        # Save snapshots for next sync
+        save_snapshots(outside_google_events + final_google_events,
+                       outside_xml_events + final_filtered_xml)
+        write_upcoming_feed(xml_index)
+    
+    return {'offline': False, 'cancelled': False,
+            'google_added': len(google_added), 'google_deleted': len(google_deleted),
+            'xml_added': len(xml_added), 'xml_deleted': len(xml_deleted)}
+
+def near_term_window():
+    """(days past, days future) slice covering today and the next NEAR_TERM_HOURS."""
+    now = datetime.now().astimezone()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return (min((now - midnight).total_seconds() / 86400, FETCH_DAYS_PAST),
+            min(NEAR_TERM_HOURS / 24, FETCH_DAYS_FUTURE))
+
+def sync_progressive(use_sync_token=None):
+    """
+    Sync today's and the next appointments first, then the rest of the period.
+
+    The near-term slice is small enough to be fetched and written to the XML
+    calendar in about a second, so the agenda of the day is right while the
+    full period is still syncing.
+    """
+    window = near_term_window()
+    if window == (FETCH_DAYS_PAST, FETCH_DAYS_FUTURE):
+        return sync_calendar_with_diff(use_sync_token)
+    
+    print(f"⏩ Synchronisation des prochaines {NEAR_TERM_HOURS} heures...")
+    near_term = sync_calendar_with_diff(use_sync_token, window)
+    if near_term['offline'] or near_term['cancelled']:
+        return near_term
+    print(f"✅ Rendez-vous des prochaines {NEAR_TERM_HOURS} heures à jour")
+    
+    print("\n🔄 Synchronisation du reste de la période...")
+    result = sync_calendar_with_diff(use_sync_token)
+    for key in ('google_added', 'google_deleted', 'xml_added', 'xml_deleted'):
+        result[key] = result.get(key, 0) + near_term[key]
+    return result
+
+def sync_backfill(use_sync_token=None):
+    """
+    First sync of the configured period, in chunks of BACKFILL_CHUNK_DAYS.
+
+    After each chunk, its snapshots are saved and a checkpoint records where
+    the next chunk starts. An interrupted backfill (crash, network loss)
+    resumes from the checkpoint at the next run, so chunks already synced
+    are not redone, and chunks not synced yet are never read as deletions.
+    """
+    checkpoint = load_backfill_checkpoint()
+    if checkpoint is None:
+        now = datetime.now(timezone.utc)
+        start = (now - timedelta(days=FETCH_DAYS_PAST)).isoformat()
+        checkpoint = {'start': start,
+                      'end': (now + timedelta(days=FETCH_DAYS_FUTURE)).isoformat(),
+                      'next': start}
+        save_backfill_checkpoint(checkpoint)
+        print(f"📦 Première synchronisation par tranches de {BACKFILL_CHUNK_DAYS} jours")
+    else:
+        print(f"📦 Reprise de la première synchronisation au {checkpoint['next'][:10]}")
+    
+    result = {'offline': False, 'cancelled': False,
+              'google_added': 0, 'google_deleted': 0, 'xml_added': 0, 'xml_deleted': 0}
+    chunk_start = datetime.fromisoformat(checkpoint['next'])
+    end = datetime.fromisoformat(checkpoint['end'])
+    while chunk_start < end:
+        chunk_end = min(chunk_start + timedelta(days=BACKFILL_CHUNK_DAYS), end)
+        now = datetime.now(timezone.utc)
+        window = ((now - chunk_start) / timedelta(days=1), (chunk_end - now) / timedelta(days=1))
+        chunk = sync_calendar_with_diff(use_sync_token, window)
+        if chunk['offline'] or chunk['cancelled']:
+            print("📴 Première synchronisation interrompue, elle reprendra au prochain lancement")
+            return chunk
+        for key in ('google_added', 'google_deleted', 'xml_added', 'xml_deleted'):
+            result[key] += chunk[key]
+        checkpoint['next'] = chunk_end.isoformat()
+        save_backfill_checkpoint(checkpoint)
+        print(f"✅ Tranche du {chunk_start:%d/%m} au {chunk_end:%d/%m} synchronisée")
+        chunk_start = chunk_end
+    
+    save_backfill_checkpoint(None)
+    return result
+
+# ============================================================================
+# BULK ICS IMPORT / EXPORT
+# ============================================================================
+
+# Calendar API quota is about 10 requests per second and per user
+IMPORT_REQUESTS_PER_SECOND = 10
+
+def import_ics(ics_path, to_google=True):
+    """
+    Seed both calendars from an .ics file.
+
+    The XML calendar is rewritten in a single streamed pass over the existing
+    appointments followed by the imported ones. Once it is written, the new
+    appointments are read back and sent to Google in rate-limited batches, so
+    memory stays flat whatever the size of the file. Events already in the XML
+    calendar (same title and start) are skipped.
+
+    If the import fails part-way, nothing has been sent to Google yet, or the
+    XML calendar already holds the imported events: events not sent then are
+    added to Google by the next sync, like any new appointment.
+    """
+    existing_keys = set()
+    max_id = 0
+    for event in iter_local_xml(XML_PATH):
+        existing_keys.add((normalize_title(event['description']), event['start_ticks']))
+        if event['id'].isdigit():
+            max_id = max(max_id, int(event['id']))
+    
+    google = GoogleCalendarBackend(get_google_calendar_service()) if to_google else None
+    counts = {'imported': 0, 'skipped': 0, 'google': 0}
+    pending_events = []
+    last_batch_time = [0.0]
+    
+    def send_pending_to_google():
+        # Stay under the per-user quota: one batch counts as BATCH_SIZE requests
+        wait = last_batch_time[0] + len(pending_events) / IMPORT_REQUESTS_PER_SECOND - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        last_batch_time[0] = time.monotonic()
+        results = google.apply([{'op': 'insert', 'event': event} for event in pending_events])
+        for event, (_, exception) in zip(pending_events, results):
+            if exception is None:
+                counts['google'] += 1
+            elif isinstance(exception, NETWORK_ERRORS):
+                queue_google_operation('insert', event['description'], body=build_google_event_body(event))
+            else:
+                print(f"❌ Échec de l'ajout au calendrier Google: {event['description']} - {exception}")
+        pending_events.clear()
+        print(f"📦 {counts['google']} événements envoyés au calendrier Google")
+    
+    def merged_appointments():
+        yield from iter_local_xml(XML_PATH)
+        next_id = max_id + 1
+        for event in iter_ics_events(ics_path):
+            title = (event['description'] or '').strip()
+            key = (normalize_title(title), rfc3339_to_dotnet_ticks(event['start']))
+            if not title or key in existing_keys:
+                counts['skipped'] += 1
+                continue
+            existing_keys.add(key)
+            event['id'] = str(next_id)
+            next_id += 1
+            counts['imported'] += 1
+            yield event
+            if counts['imported'] % 1000 == 0:
+                print(f"📦 {counts['imported']} événements importés")
+    
+    print(f"📥 Import de {ics_path}...")
+    with SyncLock():
+        stream_appointments_to_xml(merged_appointments(), XML_PATH)
+        if to_google:
+            # Imported appointments got the ids after the previous highest one
+            for event in iter_local_xml(XML_PATH):
+                if event['id'].isdigit() and int(event['id']) > max_id:
+                    pending_events.append(event)
+                    if len(pending_events) >= BATCH_SIZE:
+                        send_pending_to_google()
+            if pending_events:
+                send_pending_to_google()
+    print(f"✅ {counts['imported']} événements importés ({counts['skipped']} déjà présents), "
+          f"{counts['google']} envoyés au calendrier Google")
+    return counts
+
+def export_ics(ics_path):
+    """Export the XML calendar to an .ics file in one streamed pass."""
+    count = write_ics_events(iter_local_xml(XML_PATH), ics_path)
+    print(f"✅ {count} rendez-vous exportés vers {ics_path}")
+    return count
 
 # ============================================================================
 # MAIN FUNCTION
 # ============================================================================
 
-def main():
-    sync_calendar_with_diff()
+def xml_fingerprint():
+    """Modification time of the XML calendar, to detect changes between runs."""
+    return os.path.getmtime(XML_PATH) if os.path.exists(XML_PATH) else None
+
+def needs_backfill():
+    """Whether this is a first sync, or an interrupted one to resume."""
+    return load_backfill_checkpoint() is not None or not has_snapshots()
+
+def main(use_sync_token=None, progressive=None, backfill=False, window=None):
+    start_profile_run()
+    # A stop requested while waiting for another sync still applies
+    start_sync()
+    if progressive is None:
+        progressive = PROGRESSIVE_SYNC
+    
+    def run():
+        # The device must not stay unusable because of a slow or hanging sync.
+        # The deadline starts once this sync holds the lock, not while it waits.
+        start_deadline(SYNC_DEADLINE_SECONDS)
+        try:
+            if window is not None:
+                return sync_calendar_with_diff(use_sync_token, window)
+            if backfill or needs_backfill():
+                return sync_backfill(use_sync_token)
+            if progressive:
+                return sync_progressive(use_sync_token)
+            return sync_calendar_with_diff(use_sync_token)
+        except AUTH_ERRORS + NETWORK_ERRORS:
+            # Authenticate and connect again at the next sync (resident service)
+            reset_google_calendar_service()
+            raise
+    
+    # Concurrent invocations wait for the sync in progress instead of racing it
+    result = run_single_flight(run, fingerprint=xml_fingerprint)
+    # Empty unless started with --profile
+    for line in profile_summary():
+        print(line)
+    return result
+
+def xml_content_hash():
+    """Hash of the XML calendar, to know whether a sync changed it."""
+    if not os.path.exists(XML_PATH):
+        return None
+    with open(XML_PATH, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def launch_communicator():
+    """Start Communicator without waiting for it."""
+    return subprocess.Popen([COMMUNICATOR_EXE])
+
+def confirm_restart():
+    """Ask the user whether Communicator may be restarted now to show the new calendar."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    box = QMessageBox(QMessageBox.Question, "Agenda mis à jour",
+                      "L'agenda a été mis à jour.\n"
+                      "Redémarrer Communicator maintenant pour l'afficher ?",
+                      QMessageBox.Yes | QMessageBox.No)
+    box.setDefaultButton(QMessageBox.No)
+    box.setWindowFlags(box.windowFlags() | Qt.WindowStaysOnTopHint)
+    answer = box.exec_()
+    # Let the box disappear before Communicator is closed, which can take seconds
+    app.processEvents()
+    return answer == QMessageBox.Yes
+
+def close_communicator(process, timeout=10):
+    """
+    Ask Communicator to close, as its close button would. Returns whether it did.
+
+    It is never forced to quit: terminate() is TerminateProcess on Windows,
+    which would lose what the user was composing.
+    """
+    if os.name == 'nt':
+        # Without /F, taskkill sends WM_CLOSE instead of ending the process
+        subprocess.run(['taskkill', '/PID', str(process.pid)], capture_output=True)
+    else:
+        process.terminate()
+    try:
+        process.wait(timeout=timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
+
+def restart_communicator(process, confirm=confirm_restart):
+    """
+    Restart Communicator so that it reloads the calendar, if it is still open.
+
+    Only done once confirm() - by default, a question to the user - agrees;
+    otherwise Communicator shows the new calendar when next started.
+    """
+    if process.poll() is not None:
+        # Closed by the user meanwhile: it reads the new calendar when reopened
+        return process
+    if not confirm():
+        print("ℹ️ Le nouvel agenda sera affiché au prochain démarrage de Communicator")
+        return process
+    print("🔁 Redémarrage de Communicator pour charger le nouvel agenda")
+    if not close_communicator(process):
+        print("⚠️ Communicator ne s'est pas fermé, il n'est pas redémarré")
+        return process
+    return launch_communicator()
+
+def background_sync():
+    """
+    Headless mode: give the device back quickly, sync behind Communicator.
+
+    Communicator is started before anything else, so that neither a slow
+    sync, a sync waiting for another one nor a failure can delay it. The
+    period is then synced without a window; if the calendar changed, the user
+    is asked before Communicator is restarted. The XML calendar is only ever
+    replaced in one step.
+    """
+    process = launch_communicator() if START_COMMUNICATOR else None
+    before = xml_content_hash()
+    try:
+        main(progressive=False)
+    finally:
+        if process is not None and xml_content_hash() != before:
+            restart_communicator(process)
+
+def serve():
+    """Resident mode: sync on requests from sync_service.py until told to stop."""
+    service = SyncService(main, SERVICE_PORT, stop_function=request_stop)
+    print(f"🟢 Service de synchronisation à l'écoute sur le port {service.port}")
+    service.serve_forever()
+    print("🔴 Service de synchronisation arrêté")
+
+def watch():
+    """Headless mode: sync on Google push notifications until interrupted."""
+    if not WATCH_ADDRESS:
+        print("❌ WATCH_ADDRESS n'est pas configuré dans config.ini")
+        return
+    service = get_google_calendar_service()
+    # Notifications only say that something changed: fetch just that with the sync token
+    watch_and_sync(service, lambda: main(use_sync_token=True, progressive=False),
+                   WATCH_ADDRESS, WATCH_PORT)
 
 
 class SyncLogDialog(QDialog):
@@ -301,6 +847,12 @@ class SyncLogDialog(QDialog):
         self.close_button.setEnabled(False)
         self.close_button.setMinimumHeight(40)
         layout.addWidget(self.close_button)
+        
+        # Stops the sync at its next checkpoint, keeping what is already done
+        self.stop_button = QPushButton("Arrêter")
+        self.stop_button.clicked.connect(self.stop_sync)
+        self.stop_button.setMinimumHeight(40)
+        layout.addWidget(self.stop_button)
     
     @QtCore.pyqtSlot(str)
     def append_text(self, text=None):
@@ -309,10 +861,18 @@ class SyncLogDialog(QDialog):
         # Auto-scroll to bottom using ensureCursorVisible
         self.text_area.ensureCursorVisible()
     
+    @QtCore.pyqtSlot()
+    def stop_sync(self):
+        """Ask the sync to stop as soon as possible."""
+        request_stop()
+        self.stop_button.setEnabled(False)
+        self.append_text("⏹️ Arrêt demandé...")
+    
     @QtCore.pyqtSlot()
     def sync_finished(self):
         """Signal that sync is finished, enable close button."""
         self.close_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
         self.append_text("<br><b>✅ Synchronisation terminée. Vous pouvez maintenant fermer cette fenêtre.</b>")
 
 
@@ -321,16 +881,44 @@ class Signals(QObject):
     sync_finished = pyqtSignal()
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Synchronisation Google Calendar / Communicator")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="profile each sync phase (cProfile and tracemalloc)")
+    arg_parser.add_argument('--import-ics', metavar='FICHIER',
+                            help="import an .ics file into both calendars instead of syncing")
+    arg_parser.add_argument('--export-ics', metavar='FICHIER',
+                            help="export the local calendar to an .ics file instead of syncing")
+    arg_parser.add_argument('--watch', action='store_true',
+                            help="run without window and sync on Google push notifications")
+    arg_parser.add_argument('--backfill', action='store_true',
+                            help="sync the whole period in resumable chunks, as on the first sync")
+    arg_parser.add_argument('--background', action='store_true',
+                            help="start Communicator first and sync without window")
+    arg_parser.add_argument('--service', action='store_true',
+                            help="stay resident and sync when sync_service.py asks")
+    args, qt_args = arg_parser.parse_known_args()
+    if args.profile:
+        enable_profiling()
+    if args.watch or args.service:
+        try:
+            watch() if args.watch else serve()
+        except KeyboardInterrupt:
+            pass
+        sys.exit()
+    if (args.background or BACKGROUND_SYNC) and not (args.import_ics or args.export_ics):
+        background_sync()
+        sys.exit()
     
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyleSheet(STYLE)
     dialog = SyncLogDialog()
     dialog.show()
     class SyncRunner(QRunnable):
         
-        def __init__(self, dialog):
+        def __init__(self, dialog, job):
             super().__init__()
             self.dialog = dialog
+            self.job = job
             self.signals = Signals()
             self.signals.log_text.connect(dialog.append_text)
             self.signals.sync_finished.connect(dialog.sync_finished)
@@ -339,15 +927,22 @@ if __name__ == '__main__':
             # Ugly quick fix to get print statements into dialog
             globals()["print"] = self.signals.log_text.emit
             try:
-                main()
+                self.job()
             except Exception as ex:
                 print("Erreur: " + str(ex))
             self.signals.sync_finished.emit()
     
+    if args.import_ics:
+        job = lambda: import_ics(args.import_ics)
+    elif args.export_ics:
+        job = lambda: export_ics(args.export_ics)
+    else:
+        job = lambda: main(backfill=args.backfill)
+    
     # Run main in background thread
     pool = QThreadPool.globalInstance()
-    pool.start(SyncRunner(dialog))
+    pool.start(SyncRunner(dialog, job))
     
     app.exec_()
     if START_COMMUNICATOR:
-        os.system(r'"C:\Program Files (x86)\Tobii Dynavox\Communicator 5\Communicator.exe"')
+        os.system(f'"{COMMUNICATOR_EXE}"')
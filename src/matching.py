@@ -0,0 +1,94 @@
+import unicodedata
+from collections import defaultdict
+from time_utils import rfc3339_to_dotnet_ticks
+
+# Minimum trigram similarity (0-1) for two titles to be the same event
+MATCH_SIMILARITY = 0.7
+# Near-duplicate titles only match if their starts are at most this far apart
+MATCH_SLOT_MINUTES = 30
+TICKS_PER_MINUTE = 60 * 10**7
+
+def normalize_title(title):
+    """Matching key of a title: case-folded, without accents, single spaces."""
+    decomposed = unicodedata.normalize('NFKD', (title or '').casefold())
+    without_accents = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(without_accents.split())
+
+def trigrams(key):
+    """Character trigrams of a normalized key, padded to count word boundaries."""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def event_start_ticks(event):
+    """Start of a GoogleEvent or an XML event in .NET ticks, or None."""
+    if isinstance(event, dict):
+        start = event.get('start_ticks') or (event.get('start') and rfc3339_to_dotnet_ticks(event['start']))
+    else:
+        start = event.start and rfc3339_to_dotnet_ticks(event.start)
+    return int(start) if start else None
+
+class MatchIndex:
+    """
+    Find the event matching a title among many, tolerating small differences.
+
+    Titles that are equal once normalized always match, like exact titles did
+    before. Other titles match if their trigram similarity reaches `similarity`
+    and their starts are within `slot_minutes`. Candidates come from an
+    inverted index of trigrams, so only events sharing enough trigrams with
+    the title are compared.
+    """
+
+    def __init__(self, events=(), similarity=MATCH_SIMILARITY, slot_minutes=MATCH_SLOT_MINUTES):
+        self.similarity = similarity
+        self.slot_ticks = slot_minutes * TICKS_PER_MINUTE
+        self._exact = {}                    # key -> first event with that key
+        self._postings = defaultdict(list)  # trigram -> entry numbers
+        self._entries = []                  # (grams, start ticks, event)
+        for event in events:
+            self.add(event)
+
+    def add(self, event):
+        """Add a GoogleEvent or an XML event."""
+        title = event.get('description') if isinstance(event, dict) else event.summary
+        key = normalize_title(title)
+        if not key:
+            return
+        grams = trigrams(key)
+        number = len(self._entries)
+        self._entries.append((grams, event_start_ticks(event), event))
+        self._exact.setdefault(key, event)
+        for gram in grams:
+            self._postings[gram].append(number)
+
+    def find(self, title, start=None):
+        """
+        Return the best matching event for a title and start ticks, or None.
+
+        Without a start time, only titles equal once normalized match.
+        """
+        key = normalize_title(title)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._exact[key]
+        if start is None:
+            return None
+
+        grams = trigrams(key)
+        shared_counts = defaultdict(int)
+        for gram in grams:
+            for number in self._postings.get(gram, []):
+                shared_counts[number] += 1
+        # similarity >= s requires sharing at least s * |grams| trigrams
+        min_shared = self.similarity * len(grams)
+        best, best_similarity = None, self.similarity
+        for number, shared in shared_counts.items():
+            if shared < min_shared:
+                continue
+            other_grams, other_start, event = self._entries[number]
+            # Jaccard similarity of the trigram sets
+            score = shared / (len(grams) + len(other_grams) - shared)
+            in_slot = other_start is not None and abs(start - other_start) <= self.slot_ticks
+            if score >= best_similarity and in_slot:
+                best, best_similarity = event, score
+        return best
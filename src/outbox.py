@@ -0,0 +1,166 @@
+import os
+import json
+from auth import CALENDAR_ID, NETWORK_ERRORS
+from backends import GoogleCalendarBackend
+from event_manager import get_event_title, build_google_event_body
+from google_event import GoogleEvent, execute_gzip
+from snapshot_manager import SNAPSHOT_DIR, ensure_snapshot_dir
+
+# Append-only journal of Google mutations that could not be sent while offline.
+# It is deliberately not removed by reset_snapshots(): it holds pending work.
+OUTBOX_FILE = os.path.join(SNAPSHOT_DIR, 'google_outbox.jsonl')
+
+def queue_google_operation(op, key, body=None, event_id=None):
+    """
+    Append an 'insert', 'patch' or 'delete' operation to the outbox.
+
+    The key is the event title, used to coalesce operations on the same event.
+    """
+    ensure_snapshot_dir()
+    entry = {'op': op, 'key': key}
+    if body is not None:
+        entry['body'] = body
+    if event_id is not None:
+        entry['event_id'] = event_id
+    with open(OUTBOX_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    print(f"📮 Opération mise en attente ({op}) : {key}")
+
+def load_outbox():
+    """Load the queued operations, in the order they were queued."""
+    operations = []
+    if not os.path.exists(OUTBOX_FILE):
+        return operations
+    with open(OUTBOX_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                operations.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash while appending
+                print(f"⚠️ Ignoring corrupt outbox entry: {line.strip()}")
+    return operations
+
+def has_pending_operations():
+    """Whether there are queued operations waiting for the network."""
+    return os.path.exists(OUTBOX_FILE) and os.path.getsize(OUTBOX_FILE) > 0
+
+def _rewrite_outbox(operations):
+    """Replace the outbox with the given operations (empty list clears it)."""
+    if not operations:
+        if os.path.exists(OUTBOX_FILE):
+            os.remove(OUTBOX_FILE)
+        return
+    tmp_path = OUTBOX_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for operation in operations:
+            f.write(json.dumps(operation, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, OUTBOX_FILE)
+
+def coalesce_operations(operations):
+    """
+    Fold the operations queued for each event into the minimal equivalent list.
+
+    - insert then delete cancels out
+    - insert then patch becomes a single insert with the patched body
+    - patch then patch merges the bodies
+    - anything then delete becomes a delete
+    """
+    pending = {}
+    for operation in operations:
+        key = operation['key']
+        queued = pending.setdefault(key, [])
+        previous = queued[-1] if queued else None
+
+        if operation['op'] == 'delete':
+            if previous and previous['op'] == 'insert':
+                queued.pop()
+                if not queued:
+                    del pending[key]
+                continue
+            while queued and queued[-1]['op'] == 'patch':
+                queued.pop()
+            if not (queued and queued[-1]['op'] == 'delete'):
+                queued.append(dict(operation))
+        elif operation['op'] == 'patch' and previous and previous['op'] in ('insert', 'patch'):
+            merged = dict(previous)
+            merged['body'] = {**previous.get('body', {}), **operation.get('body', {})}
+            queued[-1] = merged
+        else:
+            queued.append(dict(operation))
+
+    return [operation for queued in pending.values() for operation in queued]
+
+def _resolve_event_id(service, operation):
+    """Find the Google event id for a patch or delete queued by title only."""
+    result = execute_gzip(service.events().list(
+        calendarId=CALENDAR_ID, q=operation['key'], maxResults=10, fields='items(id,summary)'
+    ))
+    for item in result.get('items', []):
+        event = GoogleEvent.from_item(item)
+        if event.summary.strip() == operation['key']:
+            return event.id
+    return None
+
+def flush_outbox(service):
+    """
+    Replay the queued operations in coalesced batches.
+
+    Operations that fail because the network is gone again stay in the outbox,
+    other failures are reported and dropped. Returns the number of operations
+    sent successfully.
+    """
+    operations = coalesce_operations(load_outbox())
+    if not operations:
+        _rewrite_outbox([])
+        return 0
+    print(f"\n📮 Envoi de {len(operations)} opérations en attente vers le calendrier Google...")
+
+    remaining = []
+    to_send = []
+    for operation in operations:
+        if operation['op'] != 'insert' and not operation.get('event_id'):
+            try:
+                operation['event_id'] = _resolve_event_id(service, operation)
+            except NETWORK_ERRORS:
+                remaining.append(operation)
+                continue
+            if not operation['event_id']:
+                print(f"⚠️ Could not find event in Google Calendar: {operation['key']}")
+                continue
+        to_send.append(operation)
+
+    # Queued operations carry the event resources to send as 'body'
+    results = GoogleCalendarBackend(service).apply(to_send)
+    sent = 0
+    for operation, (_, exception) in zip(to_send, results):
+        status = getattr(getattr(exception, 'resp', None), 'status', None)
+        if exception is None or (operation['op'] == 'delete' and status in (404, 410)):
+            sent += 1
+        elif isinstance(exception, NETWORK_ERRORS):
+            remaining.append(operation)
+        else:
+            print(f"❌ Échec de l'opération en attente ({operation['op']}) {operation['key']}: {exception}")
+
+    _rewrite_outbox(remaining)
+    print(f"✅ {sent} opérations en attente envoyées au calendrier Google")
+    return sent
+
+def queue_xml_changes(xml_added, xml_deleted, google_snapshot):
+    """
+    Queue the Google side of local XML changes detected while offline.
+
+    Event ids for deletions are taken from the last Google snapshot when known,
+    so that they do not need a lookup when the outbox is flushed.
+    """
+    snapshot_by_title = {event.summary.strip(): event for event in google_snapshot}
+    snapshot_by_xml_id = {event.xml_id: event for event in google_snapshot if event.xml_id is not None}
+    for event in xml_added:
+        title = get_event_title(event)
+        if title not in snapshot_by_title:
+            queue_google_operation('insert', title, body=build_google_event_body(event))
+    for event in xml_deleted:
+        title = get_event_title(event)
+        known_event = snapshot_by_xml_id.get(event['id']) or snapshot_by_title.get(title)
+        queue_google_operation('delete', title, event_id=known_event.id if known_event else None)
@@ -0,0 +1,112 @@
+import os
+import io
+import time
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+import appdirs
+
+# Profiles are written to the app data dir so they can be collected from the
+# frozen executable, where there is no console
+PROFILE_DIR = os.path.join(appdirs.user_data_dir("CalendarSync", roaming=True), 'profiles')
+# Number of functions / allocation sites listed in reports and summaries
+TOP_ENTRIES = 25
+SUMMARY_ENTRIES = 3
+
+_enabled = False
+_run_id = None
+_active_phase = None
+_phase_results = []
+
+def enable_profiling():
+    """Turn on profiling of sync phases (--profile)."""
+    global _enabled
+    _enabled = True
+
+def is_profiling_enabled():
+    return _enabled
+
+def start_profile_run():
+    """Start a new profiling run: reports of its phases share a timestamp prefix."""
+    global _run_id
+    _run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+    _phase_results.clear()
+
+@contextmanager
+def profile_phase(name):
+    """
+    Profile a sync phase with cProfile and tracemalloc when profiling is enabled.
+
+    Writes <run>_<phase>.pstats and <run>_<phase>_alloc.txt into PROFILE_DIR.
+    Nested phases are accounted to the outermost one, since only one profiler
+    can be active at a time.
+    """
+    global _active_phase
+    if not _enabled or _active_phase is not None:
+        yield
+        return
+    if _run_id is None:
+        start_profile_run()
+
+    _active_phase = name
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start_time
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _active_phase = None
+        try:
+            _write_phase_reports(name, profiler, snapshot, elapsed, peak)
+        except Exception as e:
+            print(f"⚠️ Could not write profile for phase '{name}': {e}")
+
+def _write_phase_reports(name, profiler, snapshot, elapsed, peak):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base_path = os.path.join(PROFILE_DIR, f'{_run_id}_{name}')
+    profiler.dump_stats(base_path + '.pstats')
+
+    top_allocations = snapshot.statistics('lineno')[:TOP_ENTRIES]
+    with open(base_path + '_alloc.txt', 'w', encoding='utf-8') as f:
+        f.write(f"Phase {name}: {elapsed:.3f} s, peak traced memory {peak / 1024:.1f} KiB\n\n")
+        for stat in top_allocations:
+            f.write(f"{stat}\n")
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats('cumulative')
+    hot_spots = []
+    for function in stats.fcn_list:
+        filename, line, function_name = function
+        # Skip the profiler's own frames and built-in wrappers
+        if filename == '~' or filename == __file__:
+            continue
+        cumulative_time = stats.stats[function][3]
+        hot_spots.append(f"{function_name} ({os.path.basename(filename)}:{line}) {cumulative_time:.3f} s")
+        if len(hot_spots) == SUMMARY_ENTRIES:
+            break
+
+    _phase_results.append({'phase': name, 'elapsed': elapsed, 'peak': peak,
+                           'hot_spots': hot_spots,
+                           'top_allocation': str(top_allocations[0]) if top_allocations else ''})
+
+def profile_summary():
+    """Return a short hot-spot summary of the phases profiled in the current run."""
+    if not _phase_results:
+        return []
+    lines = [f"📊 Profil enregistré dans {PROFILE_DIR} ({_run_id})"]
+    for result in _phase_results:
+        lines.append(f"• {result['phase']}: {result['elapsed']:.2f} s, "
+                     f"pic mémoire {result['peak'] / 1024:.0f} Kio")
+        for hot_spot in result['hot_spots']:
+            lines.append(f"    {hot_spot}")
+        if result['top_allocation']:
+            lines.append(f"    alloc: {result['top_allocation']}")
+    return lines
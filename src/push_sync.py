@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import uuid
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from auth import CALENDAR_ID
+from snapshot_manager import SNAPSHOT_DIR
+
+# Channel currently registered with Google, kept across restarts
+CHANNEL_FILE = os.path.join(os.path.dirname(SNAPSHOT_DIR), 'watch_channel.json')
+# Google caps web_hook channels for events at 7 days (in seconds)
+CHANNEL_TTL = 7 * 24 * 3600
+# Renew channels this long before they expire (in seconds)
+RENEWAL_MARGIN = 3600
+# Wait for notifications to settle before syncing, Google often sends bursts
+DEBOUNCE_SECONDS = 2
+# Wait before retrying to open a channel after an error, doubled on each failure (in seconds)
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 3600
+
+class NotificationReceiver:
+    """Small local HTTP server receiving Calendar push notifications."""
+
+    def __init__(self, host='', port=0):
+        self.channels = {}  # channel id -> token of the channels we accept
+        self.notified = threading.Event()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                channel_id = self.headers.get('X-Goog-Channel-ID')
+                token = self.headers.get('X-Goog-Channel-Token')
+                state = self.headers.get('X-Goog-Resource-State')
+                # Drain the (empty) body so that the connection can be reused
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if channel_id not in receiver.channels or receiver.channels[channel_id] != token:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.end_headers()
+                # 'sync' only confirms that a new channel works
+                if state in ('exists', 'not_exists'):
+                    receiver.notified.set()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def wait_for_notification(self, timeout=None):
+        """Wait until a change notification arrives. Returns False on timeout."""
+        return self.notified.wait(timeout)
+
+    def clear(self):
+        self.notified.clear()
+
+def load_channel():
+    """Load the channel registered by a previous run, or None."""
+    try:
+        with open(CHANNEL_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_channel(channel):
+    if channel is None:
+        if os.path.exists(CHANNEL_FILE):
+            os.remove(CHANNEL_FILE)
+        return
+    os.makedirs(os.path.dirname(CHANNEL_FILE), exist_ok=True)
+    with open(CHANNEL_FILE, 'w', encoding='utf-8') as f:
+        json.dump(channel, f)
+
+class WatchChannelManager:
+    """Registers an events().watch channel and renews it before it expires."""
+
+    def __init__(self, service, address, receiver, ttl=CHANNEL_TTL):
+        self.service = service
+        self.address = address
+        self.receiver = receiver
+        self.ttl = ttl
+        self.channel = load_channel()
+        if self.channel and self.channel.get('address') != address:
+            self.stop()
+        if self.channel:
+            self.receiver.channels[self.channel['id']] = self.channel['token']
+
+    def seconds_until_renewal(self):
+        if not self.channel:
+            return 0
+        return max(0, self.channel['expiration'] / 1000 - RENEWAL_MARGIN - time.time())
+
+    def ensure_channel(self):
+        """Open a channel if there is none, or replace it if it expires soon."""
+        if self.seconds_until_renewal() > 0:
+            return self.channel
+        old_channel = self.channel
+        body = {
+            'id': str(uuid.uuid4()),
+            'type': 'web_hook',
+            'address': self.address,
+            'token': secrets.token_urlsafe(24),
+            'params': {'ttl': str(self.ttl)}
+        }
+        # Accept notifications for the new channel before Google sends the first one
+        self.receiver.channels[body['id']] = body['token']
+        try:
+            response = self.service.events().watch(calendarId=CALENDAR_ID, body=body).execute()
+        except Exception:
+            self.receiver.channels.pop(body['id'], None)
+            raise
+        self.channel = {
+            'id': body['id'],
+            'token': body['token'],
+            'address': self.address,
+            'resource_id': response['resourceId'],
+            'expiration': int(response['expiration'])
+        }
+        save_channel(self.channel)
+        print(f"🔔 Canal de notification ouvert jusqu'au "
+              f"{time.strftime('%d/%m %H:%M', time.localtime(self.channel['expiration'] / 1000))}")
+        if old_channel:
+            self._stop_channel(old_channel)
+        return self.channel
+
+    def _stop_channel(self, channel):
+        self.receiver.channels.pop(channel['id'], None)
+        try:
+            self.service.channels().stop(
+                body={'id': channel['id'], 'resourceId': channel['resource_id']}
+            ).execute()
+        except Exception as e:
+            # The channel expires by itself anyway
+            print(f"⚠️ Could not stop notification channel {channel['id']}: {e}")
+
+    def stop(self):
+        """Stop the current channel."""
+        if self.channel:
+            self._stop_channel(self.channel)
+            self.channel = None
+            save_channel(None)
+
+def _run_sync(sync_function):
+    """Run a sync, keeping the watch loop alive if it fails."""
+    try:
+        sync_function()
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+
+def watch_and_sync(service, sync_function, address, port, stop_event=None):
+    """
+    Sync whenever Google notifies a change, instead of polling.
+
+    Runs one sync at start to catch up, then waits for notifications on the
+    local receiver, which must be reachable from Google at `address` (HTTPS,
+    e.g. through a reverse proxy). The channel is renewed before it expires;
+    if that fails (network error, timeout, Google server error), it is retried
+    with an increasing delay, while the current channel keeps notifying.
+    """
+    stop_event = stop_event or threading.Event()
+    receiver = NotificationReceiver(port=port)
+    receiver.start()
+    manager = WatchChannelManager(service, address, receiver)
+    print(f"👂 En attente de notifications sur le port {receiver.port}")
+    retry_delay = RETRY_DELAY
+    try:
+        _run_sync(sync_function)
+        while not stop_event.is_set():
+            try:
+                manager.ensure_channel()
+                retry_delay = RETRY_DELAY
+                timeout = manager.seconds_until_renewal()
+            except Exception as e:
+                print(f"⚠️ Could not open notification channel, retrying in {retry_delay} s: {e}")
+                timeout = retry_delay
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+            if receiver.wait_for_notification(timeout):
+                time.sleep(DEBOUNCE_SECONDS)
+                receiver.clear()
+                print("\n🔔 Changement signalé par Google, synchronisation...")
+                _run_sync(sync_function)
+    finally:
+        manager.stop()
+        receiver.shutdown()
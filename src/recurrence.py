@@ -0,0 +1,208 @@
+import os
+import json
+from datetime import datetime, date, timezone
+from dateutil import rrule, tz
+from google_event import GOOGLE_EVENT_FIELDS, execute_gzip
+from snapshot_manager import RECURRENCE_CACHE_FILE, ensure_snapshot_dir
+
+# The cache holds recurring masters, their exceptions and one-off events, kept
+# up to date with Google's incremental sync tokens.
+RECURRING_LIST_FIELDS = ('nextPageToken,nextSyncToken,items('
+                         f'{GOOGLE_EVENT_FIELDS},status,recurrence,recurringEventId,originalStartTime)')
+
+def load_event_cache():
+    """Load the cached Google events. Returns an empty cache if none exists."""
+    empty_cache = {'sync_token': None, 'time_min': None, 'events': {}}
+    try:
+        if os.path.exists(RECURRENCE_CACHE_FILE):
+            with open(RECURRENCE_CACHE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Error loading recurring event cache: {e}")
+    return empty_cache
+
+def save_event_cache(cache):
+    """Save the cached Google events for the next sync."""
+    ensure_snapshot_dir()
+    with open(RECURRENCE_CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+def _list_event_pages(service, **params):
+    """List all pages of un-expanded events. Returns (items, next_sync_token)."""
+    items = []
+    page_token = None
+    while True:
+        if page_token:
+            params['pageToken'] = page_token
+        result = execute_gzip(service.events().list(**params))
+        items.extend(result.get('items', []))
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return items, result.get('nextSyncToken')
+
+def refresh_event_cache(service, calendar_id, time_min):
+    """
+    Bring the event cache up to date with Google Calendar.
+
+    Uses the stored sync token so that only masters, exceptions and one-off
+    events that changed since the last run are downloaded. Falls back to a full
+    download when there is no token, when the token expired (HTTP 410) or when
+    the requested window starts before the cached one.
+    """
+    cache = load_event_cache()
+    params = {
+        'calendarId': calendar_id,
+        'singleEvents': False,
+        'showDeleted': True,
+        'maxResults': 250,
+        'fields': RECURRING_LIST_FIELDS
+    }
+
+    if cache.get('sync_token') and cache.get('time_min') and cache['time_min'] <= time_min:
+        try:
+            items, sync_token = _list_event_pages(service, syncToken=cache['sync_token'], **params)
+            for item in items:
+                if item.get('status') == 'cancelled' and not item.get('recurringEventId'):
+                    cache['events'].pop(item['id'], None)
+                else:
+                    cache['events'][item['id']] = item
+            cache['sync_token'] = sync_token
+            print(f"🔄 {len(items)} événements récurrents modifiés depuis la dernière synchronisation")
+            save_event_cache(cache)
+            return cache
+        except Exception as e:
+            if getattr(getattr(e, 'resp', None), 'status', None) != 410:
+                raise
+            print("⚠️ Jeton de synchronisation expiré, téléchargement complet")
+
+    items, sync_token = _list_event_pages(service, timeMin=time_min, **params)
+    cache = {
+        'sync_token': sync_token,
+        'time_min': time_min,
+        # Cancelled exceptions are kept: they remove an occurrence from a series
+        'events': {item['id']: item for item in items
+                   if item.get('status') != 'cancelled' or item.get('recurringEventId')}
+    }
+    save_event_cache(cache)
+    return cache
+
+def _parse_event_time(event_time):
+    """Parse a Google start/end field into a datetime (timed) or a date (all-day)."""
+    if 'dateTime' in event_time:
+        dt = datetime.fromisoformat(event_time['dateTime'].replace('Z', '+00:00'))
+        if event_time.get('timeZone'):
+            local_tz = tz.gettz(event_time['timeZone'])
+            if local_tz is not None:
+                dt = dt.astimezone(local_tz)
+        return dt
+    return date.fromisoformat(event_time['date'])
+
+def _occurrence_key(value):
+    """Key identifying an occurrence by its original start time."""
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return value.strftime('%Y%m%d')
+
+def _event_window_bounds(event):
+    """Return (start, end) of an event as UTC datetimes for window comparisons."""
+    bounds = []
+    for field in ('start', 'end'):
+        value = _parse_event_time(event[field])
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+        bounds.append(value.astimezone(timezone.utc))
+    return bounds
+
+def iter_occurrences(master, window_start, window_end):
+    """
+    Lazily yield the occurrences of a recurring master that overlap the window.
+
+    Each occurrence is a dict shaped like the instance Google would return with
+    singleEvents=True.
+    """
+    start = _parse_event_time(master['start'])
+    end = _parse_event_time(master['end'])
+    duration = end - start
+    all_day = not isinstance(start, datetime)
+
+    if all_day:
+        dtstart = datetime(start.year, start.month, start.day)
+        search_from = window_start.replace(tzinfo=None) - duration
+        search_until = window_end.replace(tzinfo=None)
+    else:
+        dtstart = start
+        search_from = window_start - duration
+        search_until = window_end
+
+    rules = rrule.rrulestr('\n'.join(master.get('recurrence', [])),
+                           dtstart=dtstart, forceset=True)
+    for occurrence_start in rules.xafter(search_from, inc=True):
+        if occurrence_start >= search_until:
+            break
+        if all_day:
+            occurrence_start = occurrence_start.date()
+            start_field = {'date': occurrence_start.isoformat()}
+            end_field = {'date': (occurrence_start + duration).isoformat()}
+        else:
+            time_zone = master['start'].get('timeZone')
+            start_field = {'dateTime': occurrence_start.isoformat()}
+            end_field = {'dateTime': (occurrence_start + duration).isoformat()}
+            if time_zone:
+                start_field['timeZone'] = time_zone
+                end_field['timeZone'] = time_zone
+        occurrence = dict(master)
+        occurrence.pop('recurrence', None)
+        occurrence.update({
+            'id': f"{master['id']}_{_occurrence_key(occurrence_start)}",
+            'recurringEventId': master['id'],
+            'originalStartTime': start_field,
+            'start': start_field,
+            'end': end_field
+        })
+        yield occurrence
+
+def expand_cached_events(cache, time_min, time_max):
+    """
+    Expand the cached events into single instances within [time_min, time_max].
+
+    Returns a list sorted by start time, as the API does with orderBy=startTime.
+    """
+    window_start = datetime.fromisoformat(time_min.replace('Z', '+00:00'))
+    window_end = datetime.fromisoformat(time_max.replace('Z', '+00:00'))
+
+    masters = []
+    exceptions = {}
+    singles = []
+    for event in cache['events'].values():
+        if event.get('recurrence'):
+            masters.append(event)
+        elif event.get('recurringEventId'):
+            original_start = _parse_event_time(event['originalStartTime'])
+            exceptions[(event['recurringEventId'], _occurrence_key(original_start))] = event
+        elif event.get('status') != 'cancelled':
+            singles.append(event)
+
+    instances = []
+    for master in masters:
+        if master.get('status') == 'cancelled':
+            continue
+        for occurrence in iter_occurrences(master, window_start, window_end):
+            original_start = _parse_event_time(occurrence['originalStartTime'])
+            if (master['id'], _occurrence_key(original_start)) not in exceptions:
+                instances.append(occurrence)
+
+    # Modified instances and one-off events are kept as Google sent them
+    for event in list(exceptions.values()) + singles:
+        if event.get('status') == 'cancelled':
+            continue
+        event_start, event_end = _event_window_bounds(event)
+        if event_end > window_start and event_start < window_end:
+            instances.append(event)
+
+    instances.sort(key=lambda event: _event_window_bounds(event)[0])
+    return instances
+
+def get_google_events_expanded_locally(service, calendar_id, time_min, time_max):
+    """Get Google events in the window, expanding recurring events locally."""
+    cache = refresh_event_cache(service, calendar_id, time_min)
+    return expand_cached_events(cache, time_min, time_max)
@@ -1,11 +1,27 @@
 import os
 import json
 import appdirs
+from google_event import GoogleEvent
 
 # Snapshot files to track previous states
 SNAPSHOT_DIR = os.path.join(appdirs.user_data_dir('CalendarSync', roaming=True),'calendar_snapshots')
 GOOGLE_SNAPSHOT_FILE = os.path.join(SNAPSHOT_DIR, 'google_events.json')
 XML_SNAPSHOT_FILE = os.path.join(SNAPSHOT_DIR, 'xml_events.json')
+RECURRENCE_CACHE_FILE = os.path.join(SNAPSHOT_DIR, 'recurring_cache.json')
+BACKFILL_CHECKPOINT_FILE = os.path.join(SNAPSHOT_DIR, 'backfill_checkpoint.json')
+
+# Snapshots last saved or loaded, reused as long as the files do not change
+_snapshot_cache = {'key': None, 'google': [], 'xml': []}
+
+def _snapshot_files_key():
+    """Identifies the current content of the snapshot files, or None if there are none."""
+    key = []
+    for path in (GOOGLE_SNAPSHOT_FILE, XML_SNAPSHOT_FILE):
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        key.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(key)
 
 def ensure_snapshot_dir():
     """Create snapshot directory if it doesn't exist."""
@@ -18,21 +34,27 @@ def save_snapshots(google_events, xml_events):
     
     # Save Google events snapshot
     with open(GOOGLE_SNAPSHOT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(google_events, f, indent=2, ensure_ascii=False)
+        json.dump([event.to_dict() for event in google_events], f, indent=2, ensure_ascii=False)
     
     # Save XML events snapshot
     with open(XML_SNAPSHOT_FILE, 'w', encoding='utf-8') as f:
         json.dump(xml_events, f, indent=2, ensure_ascii=False)
     
+    _snapshot_cache.update(key=_snapshot_files_key(), google=list(google_events), xml=list(xml_events))
+    
 def load_snapshots():
     """Load previous snapshots. Returns empty lists if no snapshots exist."""
+    key = _snapshot_files_key()
+    if key is not None and key == _snapshot_cache['key']:
+        return list(_snapshot_cache['google']), list(_snapshot_cache['xml'])
+    
     google_snapshot = []
     xml_snapshot = []
     
     try:
         if os.path.exists(GOOGLE_SNAPSHOT_FILE):
             with open(GOOGLE_SNAPSHOT_FILE, 'r', encoding='utf-8') as f:
-                google_snapshot = json.load(f)
+                google_snapshot = [GoogleEvent.from_item(item) for item in json.load(f)]
         
         if os.path.exists(XML_SNAPSHOT_FILE):
             with open(XML_SNAPSHOT_FILE, 'r', encoding='utf-8') as f:
@@ -40,9 +62,35 @@ def load_snapshots():
                 
     except Exception as e:
         print(f"⚠️ Error loading snapshots: {e}")
+        key = None
     
+    _snapshot_cache.update(key=key, google=list(google_snapshot), xml=list(xml_snapshot))
     return google_snapshot, xml_snapshot
 
+def has_snapshots():
+    """Whether a previous sync saved snapshots."""
+    return os.path.exists(GOOGLE_SNAPSHOT_FILE) or os.path.exists(XML_SNAPSHOT_FILE)
+
+def load_backfill_checkpoint():
+    """Load the progress of an interrupted backfill, or None."""
+    try:
+        with open(BACKFILL_CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_backfill_checkpoint(checkpoint):
+    """Record the progress of a backfill, or remove it when checkpoint is None."""
+    if checkpoint is None:
+        if os.path.exists(BACKFILL_CHECKPOINT_FILE):
+            os.remove(BACKFILL_CHECKPOINT_FILE)
+        return
+    ensure_snapshot_dir()
+    tmp_path = BACKFILL_CHECKPOINT_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, BACKFILL_CHECKPOINT_FILE)
+
 def reset_snapshots():
     """Reset snapshots - useful for debugging or starting fresh."""
     try:
@@ -50,6 +98,10 @@ def reset_snapshots():
             os.remove(GOOGLE_SNAPSHOT_FILE)
         if os.path.exists(XML_SNAPSHOT_FILE):
             os.remove(XML_SNAPSHOT_FILE)
+        if os.path.exists(RECURRENCE_CACHE_FILE):
+            os.remove(RECURRENCE_CACHE_FILE)
+        if os.path.exists(BACKFILL_CHECKPOINT_FILE):
+            os.remove(BACKFILL_CHECKPOINT_FILE)
         if os.path.exists(SNAPSHOT_DIR) and not os.listdir(SNAPSHOT_DIR):
             os.rmdir(SNAPSHOT_DIR)
         print("🔄 Snapshots reset successfully. Next sync will be treated as initial sync.")
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+from snapshot_manager import SNAPSHOT_DIR
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Lock and state of the last run live next to the snapshot directory
+APP_DATA_DIR = os.path.dirname(SNAPSHOT_DIR)
+LOCK_FILE = os.path.join(APP_DATA_DIR, 'sync.lock')
+STATE_FILE = os.path.join(APP_DATA_DIR, 'sync_state.json')
+
+class SyncLock:
+    """Exclusive lock shared by all calendar_sync processes, backed by a file."""
+
+    def __init__(self, path=LOCK_FILE):
+        self.path = path
+        self.file = None
+
+    def acquire(self, blocking=True):
+        """Acquire the lock. Returns False if non-blocking and already held."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'a+')
+        while True:
+            try:
+                if os.name == 'nt':
+                    self.file.seek(0)
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except OSError:
+                if not blocking:
+                    self.file.close()
+                    self.file = None
+                    return False
+                time.sleep(0.2)
+
+    def release(self):
+        """Release the lock."""
+        if self.file is None:
+            return
+        if os.name == 'nt':
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+def load_last_run(state_path=STATE_FILE):
+    """Load the state recorded by the last completed run, or None."""
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_last_run(state, state_path):
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+def _reusable(last_run, requested_at):
+    """Whether the last run completed after requested_at with a full sync."""
+    if last_run.get('finished_at', 0) < requested_at:
+        return False
+    result = last_run.get('result')
+    return not (isinstance(result, dict) and (result.get('cancelled') or result.get('offline')))
+
+def run_single_flight(sync_function, fingerprint=None, lock_path=LOCK_FILE, state_path=STATE_FILE):
+    """
+    Run sync_function with at most one run in progress across all processes.
+
+    A caller that finds a run in progress waits for it. The result of the last
+    run is only reused if that run finished after the caller's request and was
+    neither cancelled nor offline; a run that crashed leaves the previous,
+    older result, which is never reused. If the run started after the caller's
+    request (another waiter's follow-up), its result is reused. If it was
+    already in progress, its result is reused unless fingerprint() - a cheap
+    summary of the local inputs, e.g. the XML modification time - changed
+    since that run started, as the run may have missed a change made while it
+    was running; then exactly one follow-up run is made, which every other
+    waiter then reuses. A run that changes the XML itself thus costs one
+    follow-up.
+    """
+    requested_at = time.time()
+    lock = SyncLock(lock_path)
+    if not lock.acquire(blocking=False):
+        print("⏳ Une synchronisation est déjà en cours, attente de sa fin...")
+        lock.acquire()
+        last_run = load_last_run(state_path)
+        if last_run is not None and _reusable(last_run, requested_at):
+            covers_request = last_run['started_at'] >= requested_at
+            unchanged = fingerprint is None or fingerprint() == last_run.get('fingerprint')
+            if covers_request or unchanged:
+                lock.release()
+                print("♻️ Résultat de la synchronisation en cours réutilisé")
+                return last_run.get('result')
+        print("🔁 La synchronisation en cours ne couvre pas cette demande, nouvelle synchronisation")
+
+    try:
+        started_at = time.time()
+        # Taken before the run: what the run reads is at least this recent
+        started_fingerprint = fingerprint() if fingerprint else None
+        result = sync_function()
+        _save_last_run({
+            'started_at': started_at,
+            'finished_at': time.time(),
+            'fingerprint': started_fingerprint,
+            'result': result
+        }, state_path)
+        return result
+    finally:
+        lock.release()
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import socket
+import secrets
+import threading
+import socketserver
+from datetime import datetime, timezone
+
+def _app_data_dir():
+    """
+    appdirs.user_data_dir('CalendarSync', roaming=True), with the standard library only.
+
+    The thin client below is built on its own and starts in a fraction of a
+    second, so it must not import the application's modules or dependencies.
+    """
+    if sys.platform == 'win32':
+        # appdirs repeats the app name as the author folder
+        return os.path.join(os.environ['APPDATA'], 'CalendarSync', 'CalendarSync')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Application Support/CalendarSync')
+    return os.path.join(os.getenv('XDG_DATA_HOME', os.path.expanduser('~/.local/share')), 'CalendarSync')
+
+DEFAULT_PORT = 8766
+# Only processes of the same user can read it, and so talk to the service
+TOKEN_FILE = os.path.join(_app_data_dir(), 'service_token')
+COMMANDS = ('sync', 'status', 'stop')
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class SyncService:
+    """
+    Resident sync process, taking sync, status and stop commands on localhost.
+
+    The process keeps the Google credentials, HTTP connection and snapshots
+    loaded between syncs. Requests are one JSON line with the command and the
+    token written to TOKEN_FILE when the service starts; so is the response.
+    """
+
+    def __init__(self, sync_function, port=DEFAULT_PORT, stop_function=None, token_path=None):
+        self.sync_function = sync_function
+        self.stop_function = stop_function
+        self.token_path = token_path or TOKEN_FILE
+        self.token = secrets.token_urlsafe(24)
+        self.sync_lock = threading.Lock()
+        self.running = False
+        self.sync_count = 0
+        self.last_result = None
+        self.last_sync = None
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline())
+                except ValueError:
+                    request = {}
+                response = service.handle(request)
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+        self.server = _Server(('127.0.0.1', port), Handler)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def status(self):
+        return {'running': self.running, 'syncs': self.sync_count,
+                'last_sync': self.last_sync, 'last_result': self.last_result}
+
+    def sync(self):
+        """Run one sync; requests arriving meanwhile wait for the next one."""
+        with self.sync_lock:
+            self.running = True
+            try:
+                self.last_result = self.sync_function()
+            finally:
+                self.running = False
+                self.sync_count += 1
+                self.last_sync = datetime.now(timezone.utc).isoformat()
+            return self.last_result
+
+    def handle(self, request):
+        if not secrets.compare_digest(str(request.get('token', '')), self.token):
+            return {'ok': False, 'error': 'invalid token'}
+        command = request.get('command')
+        if command == 'status':
+            return {'ok': True, 'status': self.status()}
+        if command == 'sync':
+            try:
+                return {'ok': True, 'result': self.sync()}
+            except Exception as e:
+                return {'ok': False, 'error': str(e)}
+        if command == 'stop':
+            if self.stop_function:
+                self.stop_function()
+            # shutdown() waits for serve_forever(), which runs in another thread
+            threading.Thread(target=self._shutdown_after_sync, daemon=True).start()
+            return {'ok': True}
+        return {'ok': False, 'error': f'unknown command {command!r}'}
+
+    def _shutdown_after_sync(self):
+        # Handler threads are killed on exit: let the sync save its snapshots first
+        with self.sync_lock:
+            self.server.shutdown()
+
+    def serve_forever(self):
+        os.makedirs(os.path.dirname(self.token_path), exist_ok=True)
+        # Created readable by the user only from the start, never with default permissions
+        if os.path.exists(self.token_path):
+            os.remove(self.token_path)
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'port': self.port, 'token': self.token}, f)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.token_path):
+                os.remove(self.token_path)
+
+def send_command(command, token_path=None, timeout=None):
+    """Send a command to the running service and return its response."""
+    with open(token_path or TOKEN_FILE, 'r', encoding='utf-8') as f:
+        service = json.load(f)
+    with socket.create_connection(('127.0.0.1', service['port']), timeout=timeout) as connection:
+        connection.sendall(json.dumps({'command': command, 'token': service['token']}).encode('utf-8') + b'\n')
+        return json.loads(connection.makefile('rb').readline())
+
+# Thin client, without the application's imports: python sync_service.py sync|status|stop
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'sync'
+    if command not in COMMANDS:
+        print(f"Usage: {sys.argv[0]} [{'|'.join(COMMANDS)}]")
+        sys.exit(2)
+    try:
+        response = send_command(command)
+    except (OSError, ValueError) as e:
+        print(f"❌ Le service de synchronisation ne répond pas: {e}")
+        sys.exit(1)
+    print(json.dumps(response, indent=2, ensure_ascii=False))
+    sys.exit(0 if response.get('ok') else 1)
@@ -33,8 +33,9 @@ def filter_events_by_time_range(events, fetch_days_past=7, fetch_days_future=30)
     filtered_events = []
     for event in events:
         try:
-            # Parse the event start time
-            event_start = datetime.fromisoformat(event['start'].replace('Z', '+00:00'))
+            # Parse the event start time (XML event dict or GoogleEvent)
+            start = event['start'] if isinstance(event, dict) else event.start
+            event_start = datetime.fromisoformat(start.replace('Z', '+00:00'))
             if event_start.tzinfo is None:
                 event_start = event_start.replace(tzinfo=timezone.utc)
             else:
@@ -44,7 +45,8 @@ def filter_events_by_time_range(events, fetch_days_past=7, fetch_days_future=30)
             if time_min <= event_start <= time_max:
                 filtered_events.append(event)
         except Exception as e:
-            print(f"⚠️ Error parsing date for event '{event.get('description', 'Unknown')}': {e}")
+            title = event.get('description', 'Unknown') if isinstance(event, dict) else event.summary
+            print(f"⚠️ Error parsing date for event '{title}': {e}")
             continue
     
     return filtered_events 
\ No newline at end of file
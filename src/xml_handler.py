@@ -1,6 +1,12 @@
+import os
+import time
 from lxml import etree
 from time_utils import dotnet_ticks_to_rfc3339, rfc3339_to_dotnet_ticks
 
+# Communicator may hold the calendar open for a moment while reading it
+REPLACE_ATTEMPTS = 10
+REPLACE_RETRY_DELAY = 0.5
+
 def parse_local_xml(path):
     """Parse XML appointments file and return list of events."""
     tree = etree.parse(path)
@@ -21,44 +27,109 @@ def parse_local_xml(path):
         })
     return appointments
 
+def iter_local_xml(path):
+    """
+    Stream appointments from an XML file without loading the whole tree.
+
+    Yields the same dicts as parse_local_xml, plus the original ticks so that
+    appointments can be written back unchanged.
+    """
+    for _, appointment in etree.iterparse(path, tag='Appointment'):
+        start_ticks = appointment.find('Start').text
+        end_ticks = appointment.find('End').text
+        yield {
+            'id': appointment.find('ID').text,
+            'start': dotnet_ticks_to_rfc3339(start_ticks),
+            'end': dotnet_ticks_to_rfc3339(end_ticks),
+            'start_ticks': start_ticks,
+            'end_ticks': end_ticks,
+            'description': appointment.find('Description').text,
+            'reminder': appointment.find('Reminder').text == 'True'
+        }
+        # Free the element and the already processed siblings
+        appointment.clear()
+        while appointment.getprevious() is not None:
+            del appointment.getparent()[0]
+
+def _appointment_element(appointment):
+    """Build the <Appointment> element for an appointment dict."""
+    appt_elem = etree.Element("Appointment")
+    
+    # Add child elements
+    id_elem = etree.SubElement(appt_elem, "ID")
+    id_elem.text = appointment['id']
+    
+    start_elem = etree.SubElement(appt_elem, "Start")
+    # If it's a parsed appointment, convert back to ticks
+    if 'start_ticks' in appointment:
+        start_elem.text = appointment['start_ticks']
+    else:
+        # Convert from RFC3339 back to ticks
+        start_elem.text = rfc3339_to_dotnet_ticks(appointment['start'])
+    
+    end_elem = etree.SubElement(appt_elem, "End")
+    if 'end_ticks' in appointment:
+        end_elem.text = appointment['end_ticks']
+    else:
+        end_elem.text = rfc3339_to_dotnet_ticks(appointment['end'])
+    
+    desc_elem = etree.SubElement(appt_elem, "Description")
+    desc_elem.text = appointment['description']
+    
+    reminder_elem = etree.SubElement(appt_elem, "Reminder")
+    reminder_elem.text = str(appointment['reminder'])
+    return appt_elem
+
+def _replace_file(tmp_path, xml_path):
+    """
+    Move a fully written file over the calendar in one step.
+
+    Readers see either the old or the new calendar, never a partial one.
+    Retries while the calendar is locked (Windows) by a reading program.
+    """
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(tmp_path, xml_path)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(REPLACE_RETRY_DELAY)
+
 def write_appointments_to_xml(appointments, xml_path):
-    """Write appointments list to XML file."""
+    """Write appointments list to XML file, atomically."""
     # Create the root element
     root = etree.Element("AppointmentList")
     
     for appointment in appointments:
-        # Create appointment element
-        appt_elem = etree.SubElement(root, "Appointment")
-        
-        # Add child elements
-        id_elem = etree.SubElement(appt_elem, "ID")
-        id_elem.text = appointment['id']
-        
-        start_elem = etree.SubElement(appt_elem, "Start")
-        # If it's a parsed appointment, convert back to ticks
-        if 'start_ticks' in appointment:
-            start_elem.text = appointment['start_ticks']
-        else:
-            # Convert from RFC3339 back to ticks
-            start_elem.text = rfc3339_to_dotnet_ticks(appointment['start'])
-        
-        end_elem = etree.SubElement(appt_elem, "End")
-        if 'end_ticks' in appointment:
-            end_elem.text = appointment['end_ticks']
-        else:
-            end_elem.text = rfc3339_to_dotnet_ticks(appointment['end'])
-        
-        desc_elem = etree.SubElement(appt_elem, "Description")
-        desc_elem.text = appointment['description']
-        
-        reminder_elem = etree.SubElement(appt_elem, "Reminder")
-        reminder_elem.text = str(appointment['reminder'])
+        root.append(_appointment_element(appointment))
     
-    # Write to file
-    tree = etree.ElementTree(root)
-    tree.write(xml_path, encoding='utf-8', xml_declaration=True, pretty_print=False)
-    # Remove all line breaks in file
-    with open(xml_path, 'rt', encoding='utf-8') as f:
-        content = f.read()
-    with open(xml_path, 'wt', encoding='utf-8') as f:
-        f.write(content.replace('\n', ''))
\ No newline at end of file
+    content = etree.tostring(root, encoding='UTF-8', xml_declaration=True, pretty_print=False)
+    tmp_path = xml_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        # Remove all line breaks in file
+        f.write(content.replace(b'\n', b''))
+    _replace_file(tmp_path, xml_path)
+
+def stream_appointments_to_xml(appointments, xml_path):
+    """
+    Write appointments from any iterable to the XML file in one streamed pass.
+
+    Appointments are serialized one by one, so memory stays flat however many
+    there are. The file is written next to the target and then moved in place,
+    which also allows the iterable to read from the file being replaced.
+    """
+    tmp_path = xml_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            # Same declaration as write_appointments_to_xml, without a line break
+            f.write(b"<?xml version='1.0' encoding='UTF-8'?>")
+            with etree.xmlfile(f, encoding='utf-8') as xf:
+                with xf.element("AppointmentList"):
+                    for appointment in appointments:
+                        xf.write(_appointment_element(appointment))
+    except BaseException:
+        # The XML file is left as it was
+        os.remove(tmp_path)
+        raise
+    _replace_file(tmp_path, xml_path)
@@ -39,4 +39,26 @@ def pytest_configure(config):
     )
     config.addinivalue_line(
         "markers", "unit: marks tests as unit tests"
-    ) 
\ No newline at end of file
+    ) 
+
+@pytest.fixture(autouse=True)
+def isolate_upcoming_feed(tmp_path, monkeypatch):
+    """Keep syncs run by the tests from writing the upcoming feed of the user."""
+    import interval_index
+    monkeypatch.setattr(interval_index, 'UPCOMING_FILE', str(tmp_path / 'upcoming.json'))
+
+
+@pytest.fixture(autouse=True)
+def skip_sync_marker_migration(tmp_path, monkeypatch):
+    """Consider the one-time tagging of legacy synced events as done."""
+    import event_manager
+    marker = tmp_path / 'sync_properties_migrated'
+    marker.write_text('0')
+    monkeypatch.setattr(event_manager, 'TAG_MIGRATION_FILE', str(marker))
+
+
+@pytest.fixture(autouse=True)
+def isolate_change_journal(tmp_path, monkeypatch):
+    """Keep syncs run by the tests from appending to the change journal of the user."""
+    import change_journal
+    monkeypatch.setattr(change_journal, 'JOURNAL_DIR', str(tmp_path / 'journal'))
@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src import auth
+
+
+@pytest.mark.unit
+class TestShardedFetch:
+    """Test suite for the time-sharded Google Calendar fetch."""
+
+    @pytest.fixture
+    def stats_file(self, tmp_path):
+        path = str(tmp_path / 'fetch_stats.json')
+        with patch.object(auth, 'FETCH_STATS_FILE', path), \
+                patch.object(auth, 'ensure_snapshot_dir'), \
+                patch.object(auth, 'AuthorizedHttp'):
+            yield path
+
+    @pytest.fixture
+    def service(self):
+        """Calendar whose events are returned by every shard they overlap."""
+        items = [
+            {'id': 'week-long', 'summary': 'Séjour',
+             'start': {'date': '2024-01-05'}, 'end': {'date': '2024-01-12'}},
+            {'id': 'kine', 'summary': 'Kiné',
+             'start': {'dateTime': '2024-01-02T10:00:00+01:00'},
+             'end': {'dateTime': '2024-01-02T11:00:00+01:00'}},
+            {'id': 'ortho', 'summary': 'Orthophonie',
+             'start': {'dateTime': '2024-01-20T09:00:00Z'},
+             'end': {'dateTime': '2024-01-20T10:00:00Z'}},
+        ]
+
+        def as_utc(event_time):
+            return auth.datetime.fromisoformat(
+                event_time.get('dateTime') or event_time['date'] + 'T00:00:00+00:00'
+            )
+
+        def list_events(timeMin, timeMax, **params):
+            request = MagicMock()
+            request.execute.return_value = {'items': [
+                item for item in items
+                if as_utc(item['start']) < auth.datetime.fromisoformat(timeMax)
+                and as_utc(item['end']) > auth.datetime.fromisoformat(timeMin)
+            ]}
+            return request
+
+        service = MagicMock()
+        service.events.return_value.list.side_effect = list_events
+        return service
+
+    def test_shards_are_merged_in_order_without_duplicates(self, service, stats_file):
+        """Test that events spanning shard boundaries are only returned once."""
+        with patch.object(auth, 'get_shard_days', return_value=7):
+            events = auth.get_google_events_sharded(
+                service, '2024-01-01T00:00:00+00:00', '2024-01-29T00:00:00+00:00'
+            )
+
+        assert service.events.return_value.list.call_count == 4
+        assert [event.id for event in events] == ['kine', 'week-long', 'ortho']
+
+    def test_shard_size_adapts_to_event_density(self, service, stats_file):
+        """Test that busy calendars get smaller shards on the next run."""
+        assert auth.get_shard_days() == auth.MAX_SHARD_DAYS
+
+        auth._save_events_per_day(40)
+        assert auth.get_shard_days() == auth.MIN_SHARD_DAYS
+
+        auth._save_events_per_day(0)
+        assert auth.get_shard_days() == 10  # smoothed to 20 events per day
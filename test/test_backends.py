@@ -0,0 +1,119 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.backends import CalendarBackend, GoogleCalendarBackend, XmlCalendarBackend, IcsFileBackend
+from ics_handler import write_ics_events
+from xml_handler import parse_local_xml, write_appointments_to_xml
+
+WINDOW = ('2024-01-10T00:00:00+00:00', '2024-02-01T00:00:00+00:00')
+
+
+def appointment(event_id, day, description):
+    return {'id': event_id, 'start': f'2024-01-{day:02d}T09:00:00+00:00',
+            'end': f'2024-01-{day:02d}T10:00:00+00:00', 'description': description, 'reminder': False}
+
+
+@pytest.mark.unit
+class TestCalendarBackends:
+    """Test suite for the calendar backends."""
+
+    @pytest.fixture
+    def xml_backend(self, tmp_path):
+        path = str(tmp_path / 'Appointments.xml')
+        write_appointments_to_xml([appointment('1', 15, 'Kiné'), appointment('2', 20, 'Dentiste'),
+                                   appointment('3', 5, 'Ancien')], path)
+        return XmlCalendarBackend(path)
+
+    @pytest.fixture
+    def ics_backend(self, tmp_path):
+        path = str(tmp_path / 'agenda.ics')
+        write_ics_events([appointment('kine-1', 15, 'Kiné')], path, uid_domain=None)
+        return IcsFileBackend(path)
+
+    def test_backends_implement_the_protocol(self, xml_backend, ics_backend):
+        """Test that each backend has the operations and capability flags."""
+        for backend in (GoogleCalendarBackend(MagicMock()), xml_backend, ics_backend):
+            for attribute in CalendarBackend.__annotations__:
+                assert hasattr(backend, attribute)
+            for method in ('list_events', 'list_changes', 'apply'):
+                assert callable(getattr(backend, method))
+
+    def test_xml_bulk_apply(self, xml_backend):
+        """Test that all operations are applied with a single rewrite."""
+        results = xml_backend.apply([
+            {'op': 'insert', 'event': appointment(None, 25, 'Orthophonie')},
+            {'op': 'patch', 'event_id': '1', 'changes': {'start': '2024-01-15T11:00:00+00:00'}},
+            {'op': 'delete', 'event_id': '2'},
+            {'op': 'delete', 'event_id': '42'},
+        ])
+
+        assert results[0][0]['id'] == '4'
+        assert isinstance(results[3][1], KeyError)
+        events = {event['id']: event for event in parse_local_xml(xml_backend.path)}
+        assert sorted(events) == ['1', '3', '4']
+        assert events['1']['start'] == '2024-01-15T11:00:00+00:00'
+        assert [event['id'] for event in xml_backend.list_events(*WINDOW)] == ['1', '4']
+        events, deleted_ids, sync_token = xml_backend.list_changes()
+        assert sorted(event['id'] for event in events) == ['1', '3', '4']
+        assert (deleted_ids, sync_token) == ([], None)
+
+    def test_ics_apply_keeps_uids(self, ics_backend):
+        """Test that existing UIDs survive a rewrite and new events get unique ones."""
+        ics_backend.apply([{'op': 'insert', 'event': appointment(None, 20, 'Dentiste')}])
+
+        events = ics_backend.list_events(*WINDOW)
+        assert events[0]['id'] == 'kine-1'
+        assert events[1]['id'].endswith('@calendar-sync')
+
+    @patch('src.backends.execute_gzip')
+    def test_google_change_feed_reports_deletions(self, mock_execute_gzip):
+        """Test that deleted events come out of the change feed as ids."""
+        mock_execute_gzip.side_effect = [
+            {'items': [{'id': 'g1', 'status': 'confirmed', 'summary': 'Kiné',
+                        'start': {'dateTime': '2024-01-15T09:00:00+00:00'},
+                        'end': {'dateTime': '2024-01-15T10:00:00+00:00'}}],
+             'nextPageToken': 'page-2'},
+            {'items': [{'id': 'g2', 'status': 'cancelled'}], 'nextSyncToken': 'token-2'}
+        ]
+        backend = GoogleCalendarBackend(MagicMock())
+
+        events, deleted_ids, sync_token = backend.list_changes('token-1')
+
+        assert [event.id for event in events] == ['g1']
+        assert deleted_ids == ['g2']
+        assert sync_token == 'token-2'
+        assert 'items(status,' in backend.service.events().list.call_args[1]['fields']
+
+    @patch('src.backends.execute_batched')
+    def test_google_apply_sends_one_batch(self, mock_execute_batched):
+        """Test that operations become the matching API requests, batched."""
+        service = MagicMock()
+        mock_execute_batched.return_value = [({'id': 'g1', 'summary': 'Kiné'}, None), (None, None)]
+        backend = GoogleCalendarBackend(service)
+
+        results = backend.apply([{'op': 'insert', 'event': appointment('1', 15, 'Kiné')},
+                                 {'op': 'delete', 'event_id': 'g2'}])
+
+        mock_execute_batched.assert_called_once()
+        assert service.events().insert.call_args[1]['body']['summary'] == 'Kiné'
+        service.events().delete.assert_called_once_with(calendarId=backend.calendar_id, eventId='g2')
+        assert results[0][0].id == 'g1'
+
+    @patch('src.backends.execute_batched')
+    def test_google_apply_sends_ready_bodies_unchanged(self, mock_execute_batched):
+        """Test that event resources queued in the outbox are sent as they are."""
+        service = MagicMock()
+        mock_execute_batched.return_value = [({'id': 'g3'}, None), ({'id': 'g4'}, None)]
+        body = {'summary': 'Kiné', 'location': 'Cabinet'}
+
+        GoogleCalendarBackend(service).apply([{'op': 'patch', 'event_id': 'g3', 'body': body},
+                                              {'op': 'patch', 'event_id': 'g4',
+                                               'changes': {'description': 'Orthophonie'}}])
+
+        bodies = [call[1]['body'] for call in service.events().patch.call_args_list]
+        assert bodies == [body, {'summary': 'Orthophonie'}]
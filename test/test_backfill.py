@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import snapshot_manager
+from src.main import sync_backfill
+
+SYNCED = {'offline': False, 'cancelled': False, 'google_added': 2, 'google_deleted': 0, 'xml_added': 1, 'xml_deleted': 0}
+
+
+@pytest.mark.unit
+class TestBackfill:
+    """Test suite for the resumable first sync."""
+
+    @pytest.fixture(autouse=True)
+    def checkpoint_file(self, tmp_path):
+        path = str(tmp_path / 'backfill_checkpoint.json')
+        with patch.object(snapshot_manager, 'SNAPSHOT_DIR', str(tmp_path)), \
+             patch.object(snapshot_manager, 'BACKFILL_CHECKPOINT_FILE', path):
+            yield path
+
+    @patch('src.main.BACKFILL_CHUNK_DAYS', 7)
+    @patch('src.main.FETCH_DAYS_FUTURE', 14)
+    @patch('src.main.FETCH_DAYS_PAST', 7)
+    @patch('src.main.sync_calendar_with_diff')
+    def test_resumes_after_the_last_synced_chunk(self, mock_sync, checkpoint_file):
+        """Test that an interrupted backfill continues where it stopped."""
+        mock_sync.side_effect = [dict(SYNCED), {'offline': True, 'cancelled': False, 'xml_added': 0, 'xml_deleted': 0}]
+
+        assert sync_backfill()['offline'] is True
+        first_window = mock_sync.call_args_list[0][0][1]
+        second_window = mock_sync.call_args_list[1][0][1]
+        assert first_window == pytest.approx((7, 0), abs=0.01)
+        assert second_window == pytest.approx((0, 7), abs=0.01)
+        assert os.path.exists(checkpoint_file)
+
+        mock_sync.reset_mock()
+        mock_sync.side_effect = [dict(SYNCED), dict(SYNCED)]
+        result = sync_backfill()
+
+        # The first chunk is not synced again
+        windows = [args[0][1] for args in mock_sync.call_args_list]
+        assert windows == [pytest.approx((0, 7), abs=0.01), pytest.approx((-7, 14), abs=0.01)]
+        assert result['google_added'] == 4
+        assert not os.path.exists(checkpoint_file)
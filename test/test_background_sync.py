@@ -0,0 +1,126 @@
+import pytest
+import subprocess
+import threading
+import time
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.main import background_sync, restart_communicator
+from src.sync_lock import SyncLock, run_single_flight
+
+
+@pytest.mark.unit
+class TestBackgroundSync:
+    """Test suite for the sync running behind Communicator."""
+
+    @pytest.fixture
+    def xml_path(self, tmp_path):
+        path = tmp_path / 'Appointments.xml'
+        path.write_text("<AppointmentList/>", encoding='utf-8')
+        return str(path)
+
+    @pytest.mark.parametrize('changed', [True, False])
+    @patch('src.main.restart_communicator')
+    @patch('src.main.launch_communicator')
+    @patch('src.main.main')
+    def test_restarts_communicator_only_if_the_calendar_changed(
+        self, mock_main, mock_launch, mock_restart, changed, xml_path
+    ):
+        """Test that Communicator starts before the sync and restarts only when needed."""
+        def sync(progressive=None):
+            # Communicator is already running when the period is synced
+            mock_launch.assert_called_once()
+            if changed:
+                with open(xml_path, 'w', encoding='utf-8') as f:
+                    f.write("<AppointmentList><Appointment/></AppointmentList>")
+        mock_main.side_effect = sync
+
+        with patch('src.main.XML_PATH', xml_path), patch('src.main.START_COMMUNICATOR', True):
+            background_sync()
+
+        mock_main.assert_called_once_with(progressive=False)
+        assert mock_restart.called == changed
+        if changed:
+            mock_restart.assert_called_once_with(mock_launch.return_value)
+
+    @patch('src.main.restart_communicator')
+    @patch('src.main.launch_communicator')
+    @patch('src.main.main', side_effect=TimeoutError("timed out"))
+    def test_failed_sync_does_not_keep_communicator_from_starting(
+        self, mock_main, mock_launch, mock_restart, xml_path
+    ):
+        """Test that Communicator is started even when the sync fails."""
+        with patch('src.main.XML_PATH', xml_path), patch('src.main.START_COMMUNICATOR', True):
+            with pytest.raises(TimeoutError):
+                background_sync()
+
+        mock_launch.assert_called_once()
+        mock_restart.assert_not_called()
+
+    @patch('src.main.restart_communicator')
+    @patch('src.main.launch_communicator')
+    def test_sync_in_progress_does_not_delay_communicator(self, mock_launch, mock_restart, xml_path, tmp_path):
+        """Test that Communicator starts while the sync still waits for another one."""
+        lock = SyncLock(str(tmp_path / 'sync.lock'))
+        assert lock.acquire(blocking=False)
+        finished = threading.Event()
+
+        def run_background_sync():
+            with patch('src.main.XML_PATH', xml_path), patch('src.main.START_COMMUNICATOR', True), \
+                 patch('src.main.main', side_effect=lambda progressive: run_single_flight(
+                     dict, lock_path=str(tmp_path / 'sync.lock'), state_path=str(tmp_path / 'state.json'))):
+                background_sync()
+            finished.set()
+        thread = threading.Thread(target=run_background_sync, daemon=True)
+        thread.start()
+        try:
+            deadline = time.time() + 5
+            while not mock_launch.called and time.time() < deadline:
+                time.sleep(0.01)
+            mock_launch.assert_called_once()
+            assert not finished.is_set()
+        finally:
+            lock.release()
+        thread.join(timeout=5)
+        assert finished.is_set()
+
+    @patch('src.main.launch_communicator')
+    def test_restart_leaves_a_closed_communicator_closed(self, mock_launch):
+        """Test that a Communicator closed by the user is not reopened."""
+        process = MagicMock()
+        process.poll.return_value = 0
+        confirm = MagicMock(return_value=True)
+
+        assert restart_communicator(process, confirm) is process
+        mock_launch.assert_not_called()
+        confirm.assert_not_called()
+
+    @patch('src.main.launch_communicator')
+    def test_running_communicator_is_restarted_only_when_the_user_agrees(self, mock_launch):
+        """Test that a Communicator still in use is left alone unless the user confirms."""
+        process = MagicMock()
+        process.poll.return_value = None
+
+        assert restart_communicator(process, confirm=lambda: False) is process
+        process.terminate.assert_not_called()
+        mock_launch.assert_not_called()
+
+        with patch('src.main.os.name', 'posix'):
+            assert restart_communicator(process, confirm=lambda: True) is mock_launch.return_value
+        process.terminate.assert_called_once()
+
+    @patch('src.main.launch_communicator')
+    def test_communicator_that_does_not_close_is_not_killed(self, mock_launch):
+        """Test that Communicator is never forced to quit, e.g. while the user writes."""
+        process = MagicMock()
+        process.poll.return_value = None
+        process.wait.side_effect = subprocess.TimeoutExpired('Communicator.exe', 10)
+
+        with patch('src.main.os.name', 'posix'):
+            assert restart_communicator(process, confirm=lambda: True) is process
+        process.kill.assert_not_called()
+        mock_launch.assert_not_called()
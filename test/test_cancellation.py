@@ -0,0 +1,48 @@
+import pytest
+import time
+from unittest.mock import patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.main import main
+from cancellation import start_sync, request_stop, is_cancelled, cancel_reason
+
+
+@pytest.mark.unit
+class TestSyncDeadline:
+    """Test suite for stopping a sync on request or after its deadline."""
+
+    @pytest.fixture(autouse=True)
+    def reset(self):
+        yield
+        start_sync()
+
+    def test_stop_request_and_deadline(self):
+        """Test that a sync is cancelled once asked to, or once its deadline has passed."""
+        start_sync(0.05)
+        assert not is_cancelled()
+        time.sleep(0.1)
+        assert is_cancelled() and cancel_reason() == "délai dépassé"
+
+        start_sync()
+        request_stop()
+        assert is_cancelled() and cancel_reason() == "à la demande"
+
+    @patch('src.main.SYNC_DEADLINE_SECONDS', 1)
+    @patch('src.main.needs_backfill', return_value=False)
+    @patch('src.main.sync_calendar_with_diff')
+    def test_deadline_starts_once_the_lock_is_held(self, mock_sync, mock_needs_backfill):
+        """Test that time spent waiting for another sync does not count against the deadline."""
+        mock_sync.side_effect = lambda use_sync_token: {'cancelled': is_cancelled()}
+
+        def wait_for_other_sync(sync_function, fingerprint):
+            time.sleep(1.2)
+            return sync_function()
+
+        with patch('src.main.run_single_flight', side_effect=wait_for_other_sync):
+            result = main(progressive=False)
+
+        assert result == {'cancelled': False}
@@ -0,0 +1,82 @@
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import src.change_journal as change_journal
+from src.change_journal import append_changes, read_changes, latest_sequence, oldest_sequence, journal_entry
+from google_event import GoogleEvent
+
+
+def xml_event(event_id, day, description):
+    return {'id': event_id, 'start': f'2024-01-{day:02d}T10:00:00+00:00',
+            'end': f'2024-01-{day:02d}T11:00:00+00:00', 'description': description, 'reminder': False}
+
+
+@pytest.mark.unit
+class TestChangeJournal:
+    """Test suite for the journal of the changes applied by the syncs."""
+
+    @pytest.fixture(autouse=True)
+    def journal_dir(self, tmp_path, monkeypatch):
+        path = tmp_path / 'journal'
+        monkeypatch.setattr(change_journal, 'JOURNAL_DIR', str(path))
+        return path
+
+    def test_entries_are_numbered_after_the_last_one(self):
+        assert latest_sequence() == 0
+        assert append_changes([journal_entry('add', 'xml', xml_event('1', 15, 'Kiné'))]) == 1
+        assert append_changes([journal_entry('add', 'xml', xml_event('2', 16, 'Dentiste')),
+                               journal_entry('delete', 'xml', xml_event('1', 15, 'Kiné'))]) == 3
+
+        entries = list(read_changes())
+        assert [entry['seq'] for entry in entries] == [1, 2, 3]
+        assert entries[2]['op'] == 'delete'
+        assert entries[2]['title'] == 'Kiné'
+        assert append_changes([]) == 3
+
+    def test_read_changes_after_cursor(self, monkeypatch, journal_dir):
+        monkeypatch.setattr(change_journal, 'SEGMENT_ENTRIES', 2)
+        append_changes([journal_entry('add', 'xml', xml_event(str(i), i, f'Rendez-vous {i}'))
+                        for i in range(1, 6)])
+
+        assert len(list(journal_dir.iterdir())) == 3
+        assert [entry['seq'] for entry in read_changes(after=3)] == [4, 5]
+        assert list(read_changes(after=5)) == []
+
+    def test_google_event_entry(self):
+        event = GoogleEvent('abc', summary='Orthophonie', start='2024-01-15T10:00:00+01:00',
+                            end='2024-01-15T11:00:00+01:00')
+        assert journal_entry('delete', 'google', event) == {
+            'op': 'delete', 'origin': 'google', 'id': 'abc', 'title': 'Orthophonie',
+            'start': '2024-01-15T10:00:00+01:00', 'end': '2024-01-15T11:00:00+01:00'}
+
+    def test_partly_written_line_is_ignored(self, journal_dir):
+        append_changes([journal_entry('add', 'xml', xml_event('1', 15, 'Kiné'))])
+        segment = next(journal_dir.iterdir())
+        with open(segment, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 2, "op"')
+
+        assert latest_sequence() == 1
+        assert [entry['seq'] for entry in read_changes()] == [1]
+
+    def test_rotation_compacts_closed_segments(self, monkeypatch, journal_dir):
+        monkeypatch.setattr(change_journal, 'SEGMENT_ENTRIES', 3)
+        monkeypatch.setattr(change_journal, 'MAX_SEGMENTS', 2)
+        append_changes([journal_entry('add', 'xml', xml_event('1', 15, 'Kiné')),
+                        journal_entry('add', 'xml', xml_event('2', 16, 'Dentiste')),
+                        journal_entry('delete', 'xml', xml_event('1', 15, 'Kiné'))])
+        append_changes([journal_entry('add', 'google', xml_event('3', 17, 'Piscine'))])
+
+        # The Kiné appointment was added and deleted in the closed segment
+        assert [entry['seq'] for entry in read_changes()] == [2, 4]
+        assert oldest_sequence() == 1
+
+        append_changes([journal_entry('add', 'google', xml_event(str(i), i, f'Sortie {i}'))
+                        for i in range(20, 26)])
+        assert len(list(journal_dir.iterdir())) == 2
+        assert oldest_sequence() == 7
+        assert [entry['seq'] for entry in read_changes()] == [7, 8, 9, 10]
+        assert latest_sequence() == 10
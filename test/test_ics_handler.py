@@ -0,0 +1,209 @@
+import pytest
+import tracemalloc
+from datetime import datetime, timezone
+from unittest.mock import patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.ics_handler import iter_ics_events, write_ics_events
+from src.main import import_ics
+from xml_handler import parse_local_xml, write_appointments_to_xml
+
+SAMPLE_ICS = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:kine-1\r\n"
+    "DTSTART;TZID=Europe/Paris:20240115T100000\r\n"
+    "DTEND;TZID=Europe/Paris:20240115T110000\r\n"
+    "SUMMARY:Kiné avec une description très longue qui doit être repliée sur plu\r\n"
+    " sieurs lignes\\, comme le permet la RFC\r\n"
+    "BEGIN:VALARM\r\n"
+    "ACTION:DISPLAY\r\n"
+    "SUMMARY:Rappel\r\n"
+    "TRIGGER:-PT10M\r\n"
+    "END:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:sejour-1\r\n"
+    "DTSTART;VALUE=DATE:20240301\r\n"
+    "SUMMARY:Séjour\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:ortho-1\r\n"
+    "DTSTART:20240116T130000Z\r\n"
+    "DURATION:PT1H30M\r\n"
+    "SUMMARY:Orthophonie\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+RECURRING_ICS = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:kine-moved\r\n"
+    "RECURRENCE-ID;TZID=Europe/Paris:20240129T100000\r\n"
+    "DTSTART;TZID=Europe/Paris:20240130T160000\r\n"
+    "DTEND;TZID=Europe/Paris:20240130T170000\r\n"
+    "SUMMARY:Kiné (déplacée)\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:kine-moved\r\n"
+    "DTSTART;TZID=Europe/Paris:20240115T100000\r\n"
+    "DTEND;TZID=Europe/Paris:20240115T110000\r\n"
+    "RRULE:FREQ=WEEKLY;COUNT=20\r\n"
+    "EXDATE;TZID=Europe/Paris:20240205T100000\r\n"
+    "SUMMARY:Kiné\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:piscine\r\n"
+    "DTSTART;VALUE=DATE:20240101\r\n"
+    "RRULE:FREQ=DAILY\r\n"
+    "SUMMARY:Piscine\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+@pytest.mark.unit
+class TestIcsImportExport:
+    """Test suite for the streaming .ics importer and exporter."""
+
+    @pytest.fixture
+    def ics_path(self, tmp_path):
+        path = tmp_path / 'agenda.ics'
+        path.write_text(SAMPLE_ICS, encoding='utf-8')
+        return str(path)
+
+    @pytest.fixture
+    def xml_path(self, tmp_path):
+        """XML calendar with one existing appointment."""
+        path = str(tmp_path / 'Appointments.xml')
+        write_appointments_to_xml([{
+            'id': '7',
+            'start': '2024-01-16T13:00:00+00:00',
+            'end': '2024-01-16T14:30:00+00:00',
+            'description': 'Orthophonie',
+            'reminder': False
+        }], path)
+        return path
+
+    def test_parses_events_in_xml_form(self, ics_path):
+        """Test that VEVENTs are decoded like xml_handler appointments."""
+        events = list(iter_ics_events(ics_path))
+
+        assert [event['id'] for event in events] == ['kine-1', 'sejour-1', 'ortho-1']
+        kine, sejour, ortho = events
+        assert kine['description'].startswith('Kiné avec')
+        assert kine['description'].endswith('plusieurs lignes, comme le permet la RFC')
+        assert kine['start'] == '2024-01-15T10:00:00+01:00'
+        assert kine['reminder'] is True
+        assert sejour['end'] == '2024-03-02T00:00:00+00:00'
+        assert ortho['end'] == '2024-01-16T14:30:00+00:00'
+
+    def test_expands_recurring_series(self, tmp_path):
+        """Test that every occurrence of a series is imported, with its exceptions."""
+        path = tmp_path / 'recurring.ics'
+        path.write_text(RECURRING_ICS, encoding='utf-8')
+
+        with patch('builtins.print') as mock_print:
+            events = list(iter_ics_events(str(path), until=datetime(2024, 1, 10, tzinfo=timezone.utc)))
+        assert [event['start'] for event in events if event['description'] == 'Piscine'] == [
+            f'2024-01-{day:02d}T00:00:00+00:00' for day in range(1, 11)]
+        # A series cut at the horizon is never truncated silently
+        assert any("'Piscine' imported up to 2024-01-10 only" in call.args[0]
+                   for call in mock_print.call_args_list)
+
+        kine = [event for event in iter_ics_events(str(path)) if event['description'].startswith('Kiné')]
+        assert len(kine) == 19
+        assert len({event['id'] for event in kine}) == 19
+        assert '2024-02-05T10:00:00+01:00' not in [event['start'] for event in kine]
+        moved = [event for event in kine if event['description'] == 'Kiné (déplacée)']
+        assert [(event['id'], event['start']) for event in moved] == [
+            ('kine-moved_20240129T090000Z', '2024-01-30T16:00:00+01:00')]
+        assert kine[-1]['start'] == '2024-05-27T10:00:00+02:00'
+
+    def test_export_round_trip(self, ics_path, tmp_path):
+        """Test that exported events are read back unchanged."""
+        events = list(iter_ics_events(ics_path))
+        export_path = str(tmp_path / 'export.ics')
+
+        assert write_ics_events(iter(events), export_path) == 3
+
+        exported = list(iter_ics_events(export_path))
+        assert [event['description'] for event in exported] == [event['description'] for event in events]
+        assert exported[0]['start'] == '2024-01-15T09:00:00+00:00'
+        assert exported[0]['reminder'] is True
+        with open(export_path, 'rb') as f:
+            assert all(len(line.rstrip(b'\r\n')) <= 75 for line in f)
+
+    def test_import_skips_existing_and_numbers_new_events(self, ics_path, xml_path):
+        """Test that the import appends new events after the existing ones."""
+        with patch('src.main.XML_PATH', xml_path):
+            counts = import_ics(ics_path, to_google=False)
+
+        assert counts == {'imported': 2, 'skipped': 1, 'google': 0}
+        appointments = parse_local_xml(xml_path)
+        assert [event['id'] for event in appointments] == ['7', '8', '9']
+        assert appointments[2]['description'] == 'Séjour'
+
+    def test_import_sends_to_google_after_writing_xml(self, ics_path, xml_path):
+        """Test that imported events reach Google only once the XML calendar holds them."""
+        sent_titles = []
+
+        def execute_batched(service, requests):
+            # The XML calendar is complete when the first batch goes out
+            assert [event['id'] for event in parse_local_xml(xml_path)] == ['7', '8', '9']
+            sent_titles.extend(call.kwargs['body']['summary']
+                               for call in service.events.return_value.insert.call_args_list)
+            return [({'id': 'g'}, None)] * len(requests)
+
+        with patch('src.main.XML_PATH', xml_path), \
+                patch('src.main.get_google_calendar_service'), \
+                patch('backends.execute_batched', side_effect=execute_batched):
+            counts = import_ics(ics_path)
+
+        assert counts == {'imported': 2, 'skipped': 1, 'google': 2}
+        assert sent_titles[-1] == 'Séjour'
+
+    def test_failed_import_sends_nothing_to_google(self, ics_path, xml_path):
+        """Test that an import failing part-way leaves Google untouched."""
+        def failing_events(path):
+            yield from list(iter_ics_events(path))[:2]
+            raise ValueError("bad event")
+
+        with patch('src.main.XML_PATH', xml_path), \
+                patch('src.main.get_google_calendar_service'), \
+                patch('src.main.iter_ics_events', side_effect=failing_events), \
+                patch('backends.execute_batched') as mock_execute_batched:
+            with pytest.raises(ValueError):
+                import_ics(ics_path)
+
+        mock_execute_batched.assert_not_called()
+        assert [event['id'] for event in parse_local_xml(xml_path)] == ['7']
+        assert not os.path.exists(xml_path + '.tmp')
+
+    @pytest.mark.slow
+    def test_import_memory_stays_flat(self, tmp_path, xml_path):
+        """Test that importing thousands of events does not load them all."""
+        ics_path = str(tmp_path / 'large.ics')
+        with open(ics_path, 'w', encoding='utf-8') as f:
+            f.write("BEGIN:VCALENDAR\r\n")
+            for i in range(10000):
+                f.write(f"BEGIN:VEVENT\r\nUID:e{i}\r\nDTSTART:20240101T{i % 24:02d}0000Z\r\n"
+                        f"DTEND:20240101T{i % 24:02d}3000Z\r\nSUMMARY:Event {i}\r\nEND:VEVENT\r\n")
+            f.write("END:VCALENDAR\r\n")
+
+        tracemalloc.start()
+        with patch('src.main.XML_PATH', xml_path):
+            counts = import_ics(ics_path, to_google=False)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert counts['imported'] == 10000
+        # Only the de-duplication keys grow with the file, not the events
+        assert peak < 8 * 1024 * 1024
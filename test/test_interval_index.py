@@ -0,0 +1,77 @@
+import pytest
+import json
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.interval_index import IntervalIndex, write_upcoming_feed
+from time_utils import rfc3339_to_dotnet_ticks
+
+HOUR = 3600 * 10**7
+
+
+def xml_event(event_id, start, hours, description):
+    return {'id': event_id, 'start_ticks': str(start), 'end_ticks': str(start + hours * HOUR),
+            'description': description, 'reminder': False}
+
+
+@pytest.mark.unit
+class TestIntervalIndex:
+    """Test suite for the interval index of XML events."""
+
+    @pytest.fixture
+    def base(self):
+        return int(rfc3339_to_dotnet_ticks('2024-01-15T00:00:00+00:00'))
+
+    @pytest.fixture
+    def index(self, base):
+        # A long event first, so that overlap queries must look back past it
+        return IntervalIndex([
+            xml_event('3', base + 14 * HOUR, 1, 'Orthophonie'),
+            xml_event('1', base + 8 * HOUR, 10, 'Séjour'),
+            xml_event('2', base + 10 * HOUR, 1, 'Kiné'),
+            xml_event('4', base + 20 * HOUR, 0, 'Appel'),
+        ])
+
+    def test_range_and_next_queries(self, index, base):
+        """Test that events come back sorted by start."""
+        assert [e['id'] for e in index.starting_between(base + 9 * HOUR, base + 15 * HOUR)] == ['2', '3']
+        assert [e['id'] for e in index.next_events(base + 10 * HOUR, 2)] == ['2', '3']
+        assert index.next_events(base + 21 * HOUR, 5) == []
+
+    def test_overlap_queries(self, index, base):
+        """Test that events starting before the queried interval are found."""
+        assert [e['id'] for e in index.overlapping(base + 16 * HOUR, base + 17 * HOUR)] == ['1']
+        assert [e['id'] for e in index.overlapping(base + 10 * HOUR, base + 15 * HOUR)] == ['1', '2', '3']
+        # Touching intervals do not overlap, zero-length events overlap at their start
+        assert [e['id'] for e in index.overlapping(base + 18 * HOUR, base + 19 * HOUR)] == []
+        assert [e['id'] for e in index.overlapping(base + 20 * HOUR, base + 20 * HOUR)] == ['4']
+
+    def test_incremental_updates(self, index, base):
+        """Test that added and removed events are reflected in queries."""
+        kine = index.starting_between(base + 10 * HOUR, base + 11 * HOUR)[0]
+        assert index.remove(kine)
+        assert not index.remove(kine)
+        index.add(xml_event('5', base + 9 * HOUR, 1, 'Dentiste'))
+
+        assert len(index) == 4
+        assert [e['id'] for e in index.overlapping(base + 9 * HOUR, base + 11 * HOUR)] == ['1', '5']
+
+    def test_upcoming_feed(self, tmp_path):
+        """Test that the feed only lists events that have not started yet."""
+        now = datetime.now(timezone.utc)
+        events = [{'id': str(i), 'start': (now + timedelta(hours=i)).isoformat(),
+                   'end': (now + timedelta(hours=i, minutes=30)).isoformat(),
+                   'description': f'Event {i}', 'reminder': i == 2}
+                  for i in (-1, 1, 2, 3)]
+        path = str(tmp_path / 'upcoming.json')
+
+        write_upcoming_feed(IntervalIndex(events), count=2, path=path)
+
+        with open(path, encoding='utf-8') as f:
+            feed = json.load(f)
+        assert [e['description'] for e in feed['events']] == ['Event 1', 'Event 2']
+        assert feed['events'][1]['reminder'] is True
@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.matching import MatchIndex, normalize_title, event_start_ticks
+from src.event_manager import detect_changes
+from google_event import GoogleEvent
+
+
+@pytest.mark.unit
+class TestMatching:
+    """Test suite for near-duplicate matching between Google and XML events."""
+
+    @pytest.fixture
+    def google_events(self):
+        return [
+            GoogleEvent('g1', 'Kiné 10h', start='2024-01-15T10:00:00+01:00', end='2024-01-15T11:00:00+01:00'),
+            GoogleEvent('g2', 'Orthophonie', start='2024-01-16T14:00:00+01:00', end='2024-01-16T15:00:00+01:00'),
+        ]
+
+    def test_normalized_title(self):
+        """Test that case, accents and spacing are ignored."""
+        assert normalize_title('  Kiné   10H ') == 'kine 10h'
+        assert normalize_title(None) == ''
+
+    def test_exact_key_matches_at_any_time(self, google_events):
+        """Test that titles equal once normalized match whatever their start."""
+        index = MatchIndex(google_events)
+        assert index.find('kine 10h ').id == 'g1'
+        assert index.find('KINÉ 10H', event_start_ticks({'start': '2024-03-01T08:00:00+00:00'})).id == 'g1'
+
+    def test_near_duplicates_only_match_in_the_same_slot(self, google_events):
+        """Test that misspelled titles match events starting at about the same time."""
+        index = MatchIndex(google_events)
+        same_slot = event_start_ticks({'start': '2024-01-16T13:15:00+00:00'})
+        other_day = event_start_ticks({'start': '2024-01-17T13:00:00+00:00'})
+
+        assert index.find('Orthophonies', same_slot).id == 'g2'
+        assert index.find('Orthophonies', other_day) is None
+        assert index.find('Orthophonies') is None
+        assert index.find('Kiné 11h', event_start_ticks({'start': '2024-01-15T09:00:00+00:00'})) is None
+        # Thresholds are configurable
+        assert MatchIndex(google_events, similarity=0.9).find('Orthophonies', same_slot) is None
+
+    def test_detect_changes_uses_normalized_keys(self, google_events):
+        """Test that a respelled title is not seen as a deletion plus an addition."""
+        previous = [GoogleEvent('g1', 'kine 10h ', start=google_events[0].start)]
+        added, deleted, _ = detect_changes(google_events[:1], previous, 'google')
+        assert added == [] and deleted == []
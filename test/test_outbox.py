@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src import outbox
+
+
+def fake_batch(respond):
+    """Batch requests calling back with respond(request_id), or not at all if it returns None."""
+    def new_batch_http_request(callback):
+        batch = MagicMock()
+        request_ids = []
+        batch.add.side_effect = lambda request, request_id: request_ids.append(request_id)
+
+        def execute():
+            for request_id in request_ids:
+                response = respond(request_id)
+                if response is not None:
+                    callback(request_id, *response)
+        batch.execute.side_effect = execute
+        return batch
+    return new_batch_http_request
+
+
+@pytest.mark.unit
+class TestOfflineOutbox:
+    """Test suite for the offline outbox of Google mutations."""
+
+    @pytest.fixture
+    def outbox_file(self, tmp_path):
+        """Redirect the outbox journal to a temporary file."""
+        path = str(tmp_path / 'google_outbox.jsonl')
+        with patch.object(outbox, 'OUTBOX_FILE', path), \
+                patch.object(outbox, 'ensure_snapshot_dir'):
+            yield path
+
+    def test_coalesce_insert_then_delete_cancels_out(self):
+        """Test that an event created and deleted while offline is never sent."""
+        operations = [
+            {'op': 'insert', 'key': 'Kiné', 'body': {'summary': 'Kiné'}},
+            {'op': 'delete', 'key': 'Kiné'},
+            {'op': 'delete', 'key': 'Orthophonie', 'event_id': 'g1'},
+            {'op': 'delete', 'key': 'Orthophonie', 'event_id': 'g1'}
+        ]
+
+        assert outbox.coalesce_operations(operations) == [
+            {'op': 'delete', 'key': 'Orthophonie', 'event_id': 'g1'}
+        ]
+
+    def test_coalesce_merges_patches_into_insert(self):
+        """Test that patches of a queued insert are folded into it."""
+        operations = [
+            {'op': 'insert', 'key': 'Kiné', 'body': {'summary': 'Kiné', 'location': 'A'}},
+            {'op': 'patch', 'key': 'Kiné', 'body': {'location': 'B'}}
+        ]
+
+        assert outbox.coalesce_operations(operations) == [
+            {'op': 'insert', 'key': 'Kiné', 'body': {'summary': 'Kiné', 'location': 'B'}}
+        ]
+
+    def test_flush_sends_one_batch_and_clears_outbox(self, outbox_file):
+        """Test that queued operations are replayed in a single batch."""
+        outbox.queue_google_operation('insert', 'Kiné', body={'summary': 'Kiné'})
+        outbox.queue_google_operation('delete', 'Orthophonie', event_id='g1')
+        service = MagicMock()
+        service.new_batch_http_request.side_effect = fake_batch(lambda request_id: ({'id': request_id}, None))
+
+        sent = outbox.flush_outbox(service)
+
+        assert sent == 2
+        service.new_batch_http_request.assert_called_once()
+        assert not os.path.exists(outbox_file)
+
+    def test_flush_keeps_operations_without_response(self, outbox_file):
+        """Test that an operation whose batch response never came is not counted as sent."""
+        outbox.queue_google_operation('insert', 'Kiné', body={'summary': 'Kiné'})
+        outbox.queue_google_operation('delete', 'Orthophonie', event_id='g1')
+        service = MagicMock()
+        # Only the first request of the batch gets a response
+        service.new_batch_http_request.side_effect = fake_batch(
+            lambda request_id: ({'id': request_id}, None) if request_id == '0' else None)
+
+        sent = outbox.flush_outbox(service)
+
+        assert sent == 1
+        assert [op['key'] for op in outbox.load_outbox()] == ['Orthophonie']
+
+    def test_flush_keeps_operations_when_network_is_gone(self, outbox_file):
+        """Test that operations stay queued if the network drops during the flush."""
+        outbox.queue_google_operation('insert', 'Kiné', body={'summary': 'Kiné'})
+        service = MagicMock()
+        service.new_batch_http_request.return_value.execute.side_effect = ConnectionError()
+
+        sent = outbox.flush_outbox(service)
+
+        assert sent == 0
+        assert [op['key'] for op in outbox.load_outbox()] == ['Kiné']
@@ -0,0 +1,50 @@
+import pytest
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src import profiling
+from src.profiling import profile_phase, profile_summary
+
+
+@pytest.mark.unit
+class TestProfiling:
+    """Test suite for the profiling of sync phases."""
+
+    @pytest.fixture(autouse=True)
+    def profile_dir(self, tmp_path, monkeypatch):
+        """Profile into a temporary directory, starting from a clean state."""
+        path = tmp_path / 'profiles'
+        monkeypatch.setattr(profiling, 'PROFILE_DIR', str(path))
+        monkeypatch.setattr(profiling, '_enabled', False)
+        monkeypatch.setattr(profiling, '_run_id', None)
+        monkeypatch.setattr(profiling, '_phase_results', [])
+        return path
+
+    def test_disabled_profiling_writes_nothing(self, profile_dir):
+        """Test that phases are not profiled without --profile."""
+        with profile_phase('fetch'):
+            sum(range(1000))
+
+        assert profile_summary() == []
+        assert not profile_dir.exists()
+
+    def test_phases_write_reports_and_summary(self, profile_dir):
+        """Test that each outermost phase gets its reports and a summary entry."""
+        profiling.enable_profiling()
+        profiling.start_profile_run()
+        with profile_phase('fetch'):
+            # Nested phases are accounted to the outer one
+            with profile_phase('parse'):
+                data = [str(i) for i in range(10000)]
+        with profile_phase('apply'):
+            sorted(data)
+
+        run_id = profiling._run_id
+        assert sorted(os.listdir(profile_dir)) == sorted(
+            f'{run_id}_{phase}{suffix}' for phase in ('fetch', 'apply') for suffix in ('.pstats', '_alloc.txt'))
+        summary = profile_summary()
+        assert str(profile_dir) in summary[0]
+        assert [line.split(':')[0] for line in summary if line.startswith('•')] == ['• fetch', '• apply']
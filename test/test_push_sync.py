@@ -0,0 +1,107 @@
+import pytest
+import time
+import threading
+import urllib.request
+import urllib.error
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src import push_sync
+from src.push_sync import NotificationReceiver, WatchChannelManager, watch_and_sync
+
+
+def post_notification(port, channel_id, token, state='exists'):
+    """Stand-in for Google: POST a push notification to the local receiver."""
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/', data=b'', method='POST', headers={
+        'X-Goog-Channel-ID': channel_id,
+        'X-Goog-Channel-Token': token,
+        'X-Goog-Resource-State': state,
+        'X-Goog-Resource-ID': 'resource-1'
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+@pytest.mark.unit
+class TestPushNotifications:
+    """Test suite for push-notification driven sync."""
+
+    @pytest.fixture
+    def receiver(self):
+        receiver = NotificationReceiver(host='127.0.0.1', port=0)
+        receiver.channels['channel-1'] = 'secret'
+        receiver.start()
+        yield receiver
+        receiver.shutdown()
+
+    @pytest.fixture
+    def channel_file(self, tmp_path):
+        with patch.object(push_sync, 'CHANNEL_FILE', str(tmp_path / 'watch_channel.json')):
+            yield
+
+    def test_change_notification_triggers_sync(self, receiver):
+        """Test that a change notification on a known channel wakes the sync loop."""
+        assert post_notification(receiver.port, 'channel-1', 'secret') == 200
+        assert receiver.wait_for_notification(timeout=1)
+
+    def test_sync_handshake_and_unknown_channels_are_ignored(self, receiver):
+        """Test that the initial 'sync' message and forged notifications do not trigger a sync."""
+        assert post_notification(receiver.port, 'channel-1', 'secret', state='sync') == 200
+        assert post_notification(receiver.port, 'channel-1', 'wrong-token') == 404
+        assert post_notification(receiver.port, 'other-channel', 'secret') == 404
+        assert not receiver.wait_for_notification(timeout=0.2)
+
+    def test_channel_is_renewed_before_expiry(self, receiver, channel_file):
+        """Test that a channel close to expiry is replaced and the old one stopped."""
+        service = MagicMock()
+        expiration_ms = int((time.time() + 2 * push_sync.RENEWAL_MARGIN) * 1000)
+        service.events.return_value.watch.return_value.execute.side_effect = [
+            {'resourceId': 'resource-1', 'expiration': str(expiration_ms)},
+            {'resourceId': 'resource-2', 'expiration': str(expiration_ms)}
+        ]
+        manager = WatchChannelManager(service, 'https://example.org/notify', receiver)
+
+        first = manager.ensure_channel()
+        assert manager.ensure_channel() is first  # still valid, nothing to do
+
+        with patch('src.push_sync.time.time', return_value=time.time() + push_sync.RENEWAL_MARGIN + 1):
+            second = manager.ensure_channel()
+
+        assert second['id'] != first['id']
+        assert second['id'] in receiver.channels and first['id'] not in receiver.channels
+        service.channels.return_value.stop.assert_called_once_with(
+            body={'id': first['id'], 'resourceId': 'resource-1'}
+        )
+        assert push_sync.load_channel() == second
+
+    def test_watch_mode_survives_a_failed_renewal(self, channel_file):
+        """Test that an error while opening the channel is retried instead of ending watch mode."""
+        service = MagicMock()
+        stop_event = threading.Event()
+        syncs = []
+
+        def watch(**kwargs):
+            if service.events.return_value.watch.call_count == 1:
+                raise TimeoutError("timed out")
+            stop_event.set()
+            # Expires right away, so that the loop checks stop_event immediately
+            return {'resourceId': 'resource-1', 'expiration': str(int(time.time() * 1000))}
+        service.events.return_value.watch.return_value.execute.side_effect = lambda: watch()
+
+        with patch.object(push_sync, 'RETRY_DELAY', 0.05):
+            thread = threading.Thread(target=watch_and_sync, args=(
+                service, lambda: syncs.append(1), 'https://example.org/notify', 0, stop_event))
+            thread.start()
+            thread.join(5)
+
+        assert not thread.is_alive()
+        assert service.events.return_value.watch.call_count == 2
+        assert syncs == [1]
+        service.channels.return_value.stop.assert_called_once()
@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.recurrence import expand_cached_events, refresh_event_cache
+
+
+@pytest.mark.unit
+class TestLocalRecurrenceExpansion:
+    """Test suite for local expansion of recurring Google events."""
+
+    @pytest.fixture
+    def weekly_master(self):
+        """Weekly therapy session, every Monday at 10:00 Paris time."""
+        return {
+            'id': 'kine',
+            'summary': 'Kiné',
+            'start': {'dateTime': '2024-01-15T10:00:00+01:00', 'timeZone': 'Europe/Paris'},
+            'end': {'dateTime': '2024-01-15T11:00:00+01:00', 'timeZone': 'Europe/Paris'},
+            'recurrence': ['RRULE:FREQ=WEEKLY;BYDAY=MO']
+        }
+
+    def test_expands_only_occurrences_in_window(self, weekly_master):
+        """Test that only occurrences overlapping the window are generated."""
+        cache = {'events': {'kine': weekly_master}}
+
+        instances = expand_cached_events(cache, '2024-01-20T00:00:00+00:00', '2024-02-06T00:00:00+00:00')
+
+        assert [event['id'] for event in instances] == [
+            'kine_20240122T090000Z', 'kine_20240129T090000Z', 'kine_20240205T090000Z'
+        ]
+        assert all(event['recurringEventId'] == 'kine' for event in instances)
+        assert 'recurrence' not in instances[0]
+
+    def test_keeps_wall_clock_time_across_dst(self, weekly_master):
+        """Test that occurrences stay at 10:00 local time after the DST change."""
+        cache = {'events': {'kine': weekly_master}}
+
+        instances = expand_cached_events(cache, '2024-04-01T00:00:00+00:00', '2024-04-02T00:00:00+00:00')
+
+        assert len(instances) == 1
+        assert instances[0]['start']['dateTime'] == '2024-04-01T10:00:00+02:00'
+
+    def test_applies_exceptions(self, weekly_master):
+        """Test that moved and cancelled instances replace generated occurrences."""
+        moved = {
+            'id': 'kine_20240122T090000Z',
+            'recurringEventId': 'kine',
+            'summary': 'Kiné',
+            'originalStartTime': {'dateTime': '2024-01-22T10:00:00+01:00', 'timeZone': 'Europe/Paris'},
+            'start': {'dateTime': '2024-01-23T14:00:00+01:00', 'timeZone': 'Europe/Paris'},
+            'end': {'dateTime': '2024-01-23T15:00:00+01:00', 'timeZone': 'Europe/Paris'}
+        }
+        cancelled = {
+            'id': 'kine_20240129T090000Z',
+            'recurringEventId': 'kine',
+            'status': 'cancelled',
+            'originalStartTime': {'dateTime': '2024-01-29T10:00:00+01:00', 'timeZone': 'Europe/Paris'}
+        }
+        cache = {'events': {'kine': weekly_master, moved['id']: moved, cancelled['id']: cancelled}}
+
+        instances = expand_cached_events(cache, '2024-01-20T00:00:00+00:00', '2024-02-03T00:00:00+00:00')
+
+        assert len(instances) == 1
+        assert instances[0]['start']['dateTime'] == '2024-01-23T14:00:00+01:00'
+
+    def test_incremental_refresh_uses_sync_token(self, weekly_master, tmp_path):
+        """Test that a cached calendar is only asked for changes since the last sync."""
+        cache_file = str(tmp_path / 'recurring_cache.json')
+        service = MagicMock()
+        list_mock = service.events.return_value.list
+        list_mock.return_value.execute.side_effect = [
+            {'items': [weekly_master], 'nextSyncToken': 'token-1'},
+            {'items': [], 'nextSyncToken': 'token-2'}
+        ]
+
+        with patch('src.recurrence.RECURRENCE_CACHE_FILE', cache_file), \
+                patch('src.recurrence.ensure_snapshot_dir'):
+            refresh_event_cache(service, 'primary', '2024-01-01T00:00:00+00:00')
+            cache = refresh_event_cache(service, 'primary', '2024-01-02T00:00:00+00:00')
+
+        assert 'timeMin' in list_mock.call_args_list[0][1]
+        assert list_mock.call_args_list[1][1]['syncToken'] == 'token-1'
+        assert 'timeMin' not in list_mock.call_args_list[1][1]
+        assert cache['sync_token'] == 'token-2'
+        assert 'kine' in cache['events']
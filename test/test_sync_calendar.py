@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import Mock, patch, call
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import sys
 import os
 
@@ -8,6 +8,9 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from src.main import sync_calendar_with_diff
+from cancellation import start_sync, request_stop
+from google_event import GoogleEvent
+from change_journal import read_changes
 
 
 @pytest.mark.unit
@@ -58,7 +61,7 @@ class TestSyncCalendarWithDiff:
     @pytest.fixture
     def sample_google_events(self):
         """Sample Google Calendar events for testing."""
-        return [
+        return [GoogleEvent.from_item(item) for item in [
             {
                 'id': 'google_1',
                 'summary': 'Google Meeting',
@@ -73,7 +76,7 @@ class TestSyncCalendarWithDiff:
                 'end': {'dateTime': '2024-01-18T13:00:00+00:00'},
                 'description': ''
             }
-        ]
+        ]]
 
     @pytest.fixture
     def empty_snapshots(self):
@@ -188,13 +191,13 @@ class TestSyncCalendarWithDiff:
         mock_rfc3339_to_ticks.return_value = '637776648000000000'
         
         # New Google event added
-        new_google_event = {
+        new_google_event = GoogleEvent.from_item({
             'id': 'google_new',
             'summary': 'New Google Event',
             'start': {'dateTime': '2024-01-20T10:00:00+00:00'},
             'end': {'dateTime': '2024-01-20T11:00:00+00:00'},
             'description': 'Meeting from Google'
-        }
+        })
         
         # Mock detect_changes to return new Google event as added
         mock_detect_changes.side_effect = [
@@ -264,6 +267,7 @@ class TestSyncCalendarWithDiff:
             ([], [], []),  # Google changes (no changes)
             ([], [deleted_xml_event], [])  # XML changes (one deletion)
         ]
+        mock_delete_google.return_value = ([deleted_xml_event], [(deleted_xml_event, sample_google_events[0])])
         
         # Execute the function
         sync_calendar_with_diff()
@@ -406,13 +410,13 @@ class TestSyncCalendarWithDiff:
         mock_rfc3339_to_ticks.return_value = '637776648000000000'
         
         # Google event that was synced from XML (has special description)
-        synced_google_event = {
+        synced_google_event = GoogleEvent.from_item({
             'id': 'google_synced',
             'summary': 'Previously Synced Event',
             'start': {'dateTime': '2024-01-20T10:00:00+00:00'},
             'end': {'dateTime': '2024-01-20T11:00:00+00:00'},
             'description': 'Synced from local XML - ID 1'
-        }
+        })
         
         mock_get_google_events.return_value = [synced_google_event]
         
@@ -430,4 +434,279 @@ class TestSyncCalendarWithDiff:
         mock_write_xml.assert_not_called()
         
         # Verify snapshots were saved
-        mock_save_snapshots.assert_called_once() 
\ No newline at end of file
+        mock_save_snapshots.assert_called_once() 
+
+    @patch('src.main.save_snapshots')
+    @patch('src.main.queue_xml_changes')
+    @patch('src.main.parse_local_xml')
+    @patch('src.main.filter_events_by_time_range')
+    @patch('src.main.load_snapshots')
+    @patch('src.main.get_google_calendar_service')
+    def test_offline_sync_queues_xml_changes(
+        self,
+        mock_get_service,
+        mock_load_snapshots,
+        mock_filter_events,
+        mock_parse_xml,
+        mock_queue_xml_changes,
+        mock_save_snapshots,
+        sample_xml_events,
+        snapshots_with_existing_data
+    ):
+        """Test that XML changes are queued for Google when the network is down."""
+        # Setup mocks
+        mock_get_service.side_effect = ConnectionError("Network is unreachable")
+        mock_parse_xml.return_value = sample_xml_events
+        mock_filter_events.return_value = sample_xml_events
+        mock_load_snapshots.return_value = snapshots_with_existing_data
+        prev_google_events, _ = snapshots_with_existing_data
+        
+        # Execute the function
+        sync_calendar_with_diff()
+        
+        # The second XML event is new since the last snapshot
+        mock_queue_xml_changes.assert_called_once_with(
+            [sample_xml_events[1]], [], prev_google_events
+        )
+        
+        # Google snapshot is kept, XML snapshot reflects the current file
+        mock_save_snapshots.assert_called_once_with(prev_google_events, sample_xml_events)
+
+    @patch('src.main.save_snapshots')
+    @patch('src.main.get_events_past_week_to_next_month')
+    @patch('src.main.parse_local_xml')
+    @patch('src.main.load_snapshots')
+    @patch('src.main.delete_xml_events')
+    @patch('src.main.get_google_calendar_service')
+    def test_window_sync_keeps_snapshots_outside_the_window(
+        self,
+        mock_get_service,
+        mock_delete_xml,
+        mock_load_snapshots,
+        mock_parse_xml,
+        mock_get_google_events,
+        mock_save_snapshots,
+        mock_google_service
+    ):
+        """Test that syncing the near-term slice leaves later events alone."""
+        now = datetime.now(timezone.utc)
+        def at(hours):
+            return (now + timedelta(hours=hours)).isoformat()
+        tomorrow = GoogleEvent('g1', 'Kiné', start=at(20), end=at(21))
+        next_week = GoogleEvent('g2', 'Dentiste', start=at(24 * 7), end=at(24 * 7 + 1))
+        xml_tomorrow = {'id': '1', 'start': at(20), 'end': at(21), 'description': 'Kiné', 'reminder': False}
+        xml_next_week = {'id': '2', 'start': at(24 * 7), 'end': at(24 * 7 + 1),
+                         'description': 'Dentiste', 'reminder': False}
+        
+        mock_get_service.return_value = mock_google_service
+        mock_parse_xml.return_value = [xml_tomorrow, xml_next_week]
+        # Only the events of the next two days are fetched
+        mock_get_google_events.return_value = [tomorrow]
+        mock_load_snapshots.return_value = ([tomorrow, next_week], [xml_tomorrow, xml_next_week])
+        
+        result = sync_calendar_with_diff(window=(0, 2))
+        
+        # Events after the window are not mistaken for deletions
+        mock_delete_xml.assert_not_called()
+        assert result['google_deleted'] == 0
+        mock_get_google_events.assert_called_with(mock_google_service, 0, 2, False)
+        saved_google, saved_xml = mock_save_snapshots.call_args[0]
+        assert sorted(event.id for event in saved_google) == ['g1', 'g2']
+        assert sorted(event['id'] for event in saved_xml) == ['1', '2']
+
+    @patch('src.main.save_snapshots')
+    @patch('src.main.get_events_past_week_to_next_month')
+    @patch('src.main.parse_local_xml')
+    @patch('src.main.filter_events_by_time_range')
+    @patch('src.main.load_snapshots')
+    @patch('src.main.write_appointments_to_xml')
+    @patch('src.main.get_google_calendar_service')
+    def test_applied_additions_are_journaled(
+        self,
+        mock_get_service,
+        mock_write_xml,
+        mock_load_snapshots,
+        mock_filter_events,
+        mock_parse_xml,
+        mock_get_google_events,
+        mock_save_snapshots,
+        mock_google_service,
+        sample_google_events
+    ):
+        """Test that an event written to the other calendar is journaled for downstream consumers."""
+        mock_get_service.return_value = mock_google_service
+        mock_parse_xml.return_value = []
+        mock_filter_events.return_value = []
+        mock_get_google_events.return_value = sample_google_events[:1]
+        mock_load_snapshots.return_value = ([], [])
+        
+        sync_calendar_with_diff()
+        
+        mock_write_xml.assert_called_once()
+        assert [(entry['seq'], entry['op'], entry['origin'], entry['id']) for entry in read_changes()] == [
+            (1, 'add', 'google', 'google_1')]
+
+    @patch('src.main.save_snapshots')
+    @patch('src.main.get_events_past_week_to_next_month')
+    @patch('src.main.parse_local_xml')
+    @patch('src.main.filter_events_by_time_range')
+    @patch('src.main.load_snapshots')
+    @patch('src.main.write_appointments_to_xml')
+    @patch('src.main.get_google_calendar_service')
+    def test_skipped_changes_are_not_journaled(
+        self,
+        mock_get_service,
+        mock_write_xml,
+        mock_load_snapshots,
+        mock_filter_events,
+        mock_parse_xml,
+        mock_get_google_events,
+        mock_save_snapshots,
+        mock_google_service,
+        sample_google_events
+    ):
+        """Test that only the changes actually written to the other calendar are journaled."""
+        lunch_row = {'id': '1', 'start': '2024-01-18T12:00:00+00:00', 'end': '2024-01-18T13:00:00+00:00',
+                     'description': 'Lunch break', 'reminder': False}
+        mock_get_service.return_value = mock_google_service
+        mock_parse_xml.return_value = [lunch_row]
+        mock_filter_events.return_value = [lunch_row]
+        mock_get_google_events.return_value = sample_google_events
+        mock_load_snapshots.return_value = ([], [lunch_row])
+        
+        sync_calendar_with_diff()
+        
+        # Both Google events are new, but Lunch Break is already in the XML calendar
+        written = mock_write_xml.call_args[0][0]
+        assert [event['description'] for event in written] == ['Lunch break', 'Google Meeting']
+        assert [(entry['op'], entry['origin'], entry['id']) for entry in read_changes()] == [
+            ('add', 'google', 'google_1')]
+
+    @patch('src.main.save_snapshots')
+    @patch('src.main.get_events_past_week_to_next_month')
+    @patch('src.main.parse_local_xml')
+    @patch('src.main.filter_events_by_time_range')
+    @patch('src.main.load_snapshots')
+    @patch('src.main.get_google_calendar_service')
+    def test_stopped_sync_records_what_was_applied(
+        self,
+        mock_get_service,
+        mock_load_snapshots,
+        mock_filter_events,
+        mock_parse_xml,
+        mock_get_google_events,
+        mock_save_snapshots,
+        mock_google_service,
+        sample_xml_events,
+        sample_google_events
+    ):
+        """Test that a sync stopped midway keeps a consistent snapshot."""
+        mock_get_service.return_value = mock_google_service
+        mock_parse_xml.return_value = sample_xml_events
+        mock_filter_events.return_value = sample_xml_events
+        mock_get_google_events.return_value = sample_google_events[:1]
+        mock_load_snapshots.return_value = (sample_google_events[:1], [])
+        # The user presses "Arrêter" while the first event is being sent
+        insert_request = mock_google_service.events.return_value.insert.return_value
+        insert_request.execute.side_effect = lambda: request_stop() or {'id': 'google_doctor',
+                                                                        'summary': 'Doctor Appointment'}
+        
+        start_sync()
+        try:
+            result = sync_calendar_with_diff()
+        finally:
+            start_sync()
+        
+        assert result['cancelled'] is True
+        assert result['xml_added'] == 1
+        insert_request.execute.assert_called_once()
+        # No final fetch, and the event not sent yet is still a change for the next sync
+        mock_get_google_events.assert_called_once()
+        saved_google, saved_xml = mock_save_snapshots.call_args[0]
+        assert saved_google == sample_google_events[:1] + [GoogleEvent('google_doctor', 'Doctor Appointment')]
+        assert saved_xml == sample_xml_events[:1]
+
+    @patch('src.main.save_snapshots')
+    @patch('src.main.get_events_past_week_to_next_month')
+    @patch('src.main.parse_local_xml')
+    @patch('src.main.filter_events_by_time_range')
+    @patch('src.main.load_snapshots')
+    @patch('src.main.write_appointments_to_xml')
+    @patch('src.main.get_google_calendar_service')
+    def test_stopped_sync_records_rows_written_to_xml(
+        self,
+        mock_get_service,
+        mock_write_xml,
+        mock_load_snapshots,
+        mock_filter_events,
+        mock_parse_xml,
+        mock_get_google_events,
+        mock_save_snapshots,
+        mock_google_service,
+        sample_xml_events,
+        sample_google_events
+    ):
+        """Test that rows written to XML before a stop are in the XML snapshot."""
+        mock_get_service.return_value = mock_google_service
+        mock_parse_xml.return_value = sample_xml_events[:1]
+        mock_filter_events.return_value = sample_xml_events[:1]
+        mock_get_google_events.return_value = sample_google_events
+        mock_load_snapshots.return_value = (sample_google_events[:1], sample_xml_events[:1])
+        # The user presses "Arrêter" while the Google event is written to XML
+        mock_write_xml.side_effect = lambda *args: request_stop()
+        
+        start_sync()
+        try:
+            result = sync_calendar_with_diff()
+        finally:
+            start_sync()
+        
+        assert result['cancelled'] is True
+        assert result['google_added'] == 1
+        saved_google, saved_xml = mock_save_snapshots.call_args[0]
+        assert saved_google == sample_google_events
+        assert [(event['id'], event['description']) for event in saved_xml] == [
+            ('1', 'Doctor Appointment'), ('2', 'Lunch Break')]
+        assert saved_xml[1]['start'] == '2024-01-18T12:00:00+00:00'
+
+    @patch('src.main.save_snapshots')
+    @patch('src.main.get_events_past_week_to_next_month')
+    @patch('src.main.parse_local_xml')
+    @patch('src.main.filter_events_by_time_range')
+    @patch('src.main.load_snapshots')
+    @patch('event_manager.write_appointments_to_xml')
+    @patch('src.main.get_google_calendar_service')
+    def test_stopped_sync_drops_rows_removed_from_xml(
+        self,
+        mock_get_service,
+        mock_write_xml,
+        mock_load_snapshots,
+        mock_filter_events,
+        mock_parse_xml,
+        mock_get_google_events,
+        mock_save_snapshots,
+        mock_google_service,
+        sample_xml_events,
+        sample_google_events
+    ):
+        """Test that rows removed from XML before a stop are not read as XML deletions next time."""
+        synced_row = {'id': '3', 'start': '2024-01-17T11:00:00+00:00', 'end': '2024-01-17T12:00:00+00:00',
+                      'description': 'Google Meeting', 'reminder': False}
+        mock_get_service.return_value = mock_google_service
+        mock_parse_xml.return_value = sample_xml_events[:1] + [synced_row]
+        mock_filter_events.return_value = sample_xml_events[:1] + [synced_row]
+        # Google Meeting was deleted in Google
+        mock_get_google_events.return_value = sample_google_events[1:]
+        mock_load_snapshots.return_value = (sample_google_events, sample_xml_events[:1] + [synced_row])
+        mock_write_xml.side_effect = lambda *args: request_stop()
+        
+        start_sync()
+        try:
+            result = sync_calendar_with_diff()
+        finally:
+            start_sync()
+        
+        assert result['cancelled'] is True
+        saved_google, saved_xml = mock_save_snapshots.call_args[0]
+        assert saved_google == sample_google_events[1:]
+        assert saved_xml == sample_xml_events[:1]
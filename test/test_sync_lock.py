@@ -0,0 +1,104 @@
+import pytest
+import threading
+import time
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.sync_lock import run_single_flight
+
+
+@pytest.mark.unit
+class TestSingleFlightSync:
+    """Test suite for the cross-process single-flight sync lock."""
+
+    @pytest.fixture
+    def paths(self, tmp_path):
+        """Lock and state files in a temporary directory."""
+        return {'lock_path': str(tmp_path / 'sync.lock'),
+                'state_path': str(tmp_path / 'sync_state.json')}
+
+    def run_with_waiters(self, paths, waiters, fingerprint, first_result=None):
+        """
+        Start a slow sync, then `waiters` concurrent invocations while it runs.
+
+        The first run returns first_result() if given, which may raise.
+        """
+        calls = []
+        release_first_run = threading.Event()
+
+        def sync():
+            calls.append(time.time())
+            if len(calls) == 1:
+                release_first_run.wait(5)
+                if first_result:
+                    return first_result()
+            return {'run': len(calls)}
+
+        def run_first():
+            try:
+                results.append(run_single_flight(sync, fingerprint, **paths))
+            except RuntimeError:
+                results.append('crashed')
+
+        results = []
+        first = threading.Thread(target=run_first)
+        first.start()
+        while not calls:
+            time.sleep(0.01)
+
+        threads = [threading.Thread(target=lambda: results.append(
+            run_single_flight(sync, fingerprint, **paths))) for _ in range(waiters)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.3)
+        release_first_run.set()
+        for thread in [first] + threads:
+            thread.join(10)
+        return calls, results
+
+    def test_waiter_reuses_result_when_nothing_changed(self, paths):
+        """Test that a second invocation reuses the result of the run in progress."""
+        calls, results = self.run_with_waiters(paths, 1, fingerprint=lambda: 'unchanged')
+
+        assert len(calls) == 1
+        assert results == [{'run': 1}, {'run': 1}]
+
+    def test_single_follow_up_when_inputs_changed(self, paths):
+        """Test that several waiters share exactly one follow-up run after a change."""
+        fingerprints = iter(range(1000))
+        calls, results = self.run_with_waiters(paths, 3, fingerprint=lambda: next(fingerprints))
+
+        assert len(calls) == 2
+        assert results.count({'run': 2}) == 3
+
+    def test_waiter_runs_again_after_a_crashed_run(self, paths):
+        """Test that the result of an older run is not reused when the run in progress crashed."""
+        run_single_flight(lambda: {'run': 'old'}, lambda: 'unchanged', **paths)
+
+        def crash():
+            raise RuntimeError("sync failed")
+        calls, results = self.run_with_waiters(paths, 1, fingerprint=lambda: 'unchanged', first_result=crash)
+
+        assert len(calls) == 2
+        assert results == ['crashed', {'run': 2}]
+
+    def test_waiter_runs_again_after_a_cancelled_run(self, paths):
+        """Test that a run stopped early does not stand for the waiters' requests."""
+        calls, results = self.run_with_waiters(paths, 2, fingerprint=lambda: 'unchanged',
+                                               first_result=lambda: {'cancelled': True})
+
+        assert len(calls) == 2
+        assert results.count({'run': 2}) == 2
+
+    def test_waiter_runs_again_after_a_change_during_the_run(self, paths):
+        """Test that a change made while the run is in progress is not taken as covered."""
+        xml_version = ['v1']
+        calls, results = self.run_with_waiters(
+            paths, 1, fingerprint=lambda: xml_version[0],
+            first_result=lambda: xml_version.__setitem__(0, 'v2') or {'run': 1})
+
+        assert len(calls) == 2
+        assert results == [{'run': 1}, {'run': 2}]
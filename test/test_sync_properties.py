@@ -0,0 +1,65 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.event_manager import build_google_event_body, delete_google_events, migrate_legacy_sync_markers
+from google_event import GoogleEvent
+
+XML_EVENT = {'id': '12', 'start': '2024-01-15T09:00:00+00:00', 'end': '2024-01-15T10:00:00+00:00',
+             'description': 'Kiné', 'reminder': False}
+
+
+@pytest.mark.unit
+class TestSyncProperties:
+    """Test suite for tagging the events created by the sync."""
+
+    def test_created_events_are_tagged(self):
+        """Test that the XML id travels in private extended properties."""
+        item = dict(build_google_event_body(XML_EVENT), id='g1')
+        event = GoogleEvent.from_item(item)
+
+        assert item['extendedProperties'] == {'private': {'syncSource': 'xml', 'xmlId': '12'}}
+        assert event.xml_id == '12' and event.synced_from_xml
+        # Snapshots keep the tag
+        assert GoogleEvent.from_item(event.to_dict()) == event
+        assert not GoogleEvent('g2', 'Kiné').synced_from_xml
+        assert GoogleEvent('g3', 'Kiné', description='Synced from local XML - ID 3').synced_from_xml
+
+    def test_deletion_looks_up_the_tagged_event(self):
+        """Test that the Google copy of an XML event is found by its XML id."""
+        service = MagicMock()
+        service.events().list().execute.return_value = {'items': [{'id': 'g1', 'summary': 'Kiné'}]}
+
+        delete_google_events(service, [XML_EVENT])
+
+        list_calls = service.events().list.call_args_list
+        assert list_calls[-1][1]['privateExtendedProperty'] == 'xmlId=12'
+        service.events().delete.assert_called_once_with(calendarId='primary', eventId='g1')
+
+    @patch('src.event_manager.execute_batched')
+    def test_legacy_events_are_tagged_once(self, mock_execute_batched, tmp_path):
+        """Test that events with the legacy marker are patched, then never looked up again."""
+        service = MagicMock()
+        service.events().list().execute.return_value = {'items': [
+            {'id': 'g1', 'description': 'Synced from local XML - ID 7'},
+            {'id': 'g2', 'description': 'Synced from local XML - ID 8',
+             'extendedProperties': {'private': {'syncSource': 'xml', 'xmlId': '8'}}},
+            {'id': 'g3', 'description': 'Notes: Synced from local XML is mentioned here'},
+        ]}
+        mock_execute_batched.return_value = [({'id': 'g1'}, None)]
+        marker = str(tmp_path / 'migrated')
+
+        with patch('src.event_manager.TAG_MIGRATION_FILE', marker):
+            assert migrate_legacy_sync_markers(service) == 1
+            service.events().list.reset_mock()
+            assert migrate_legacy_sync_markers(service) == 0
+
+        service.events().patch.assert_called_once_with(
+            calendarId='primary', eventId='g1', fields='id',
+            body={'extendedProperties': {'private': {'syncSource': 'xml', 'xmlId': '7'}}}
+        )
+        service.events().list.assert_not_called()
@@ -0,0 +1,125 @@
+import pytest
+import threading
+import time
+import subprocess
+import appdirs
+from unittest.mock import patch
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.sync_service import SyncService, send_command, TOKEN_FILE
+import snapshot_manager
+from google_event import GoogleEvent
+from google.auth.exceptions import RefreshError
+import auth
+
+
+@pytest.mark.unit
+class TestSyncService:
+    """Test suite for the resident sync service."""
+
+    @pytest.fixture
+    def running_service(self, tmp_path):
+        results = iter([{'xml_added': 1}, {'xml_added': 0}])
+        stopped = threading.Event()
+        service = SyncService(lambda: next(results), port=0, stop_function=stopped.set,
+                              token_path=str(tmp_path / 'service_token'))
+        thread = threading.Thread(target=service.serve_forever, daemon=True)
+        thread.start()
+        while not os.path.exists(service.token_path):
+            time.sleep(0.01)
+        yield service, stopped
+        if thread.is_alive():
+            service.server.shutdown()
+        thread.join(timeout=5)
+
+    def test_commands(self, running_service):
+        """Test that the client triggers syncs and reads the status."""
+        service, stopped = running_service
+
+        assert send_command('sync', service.token_path, timeout=5) == {'ok': True, 'result': {'xml_added': 1}}
+        send_command('sync', service.token_path, timeout=5)
+        status = send_command('status', service.token_path, timeout=5)['status']
+        assert status['syncs'] == 2 and status['last_result'] == {'xml_added': 0}
+        assert send_command('nap', service.token_path, timeout=5)['ok'] is False
+
+        assert send_command('stop', service.token_path, timeout=5) == {'ok': True}
+        assert stopped.is_set()
+
+    def test_stop_waits_for_the_sync_in_progress(self, tmp_path):
+        """Test that the service only stops once the running sync has finished."""
+        sync_started, release_sync, sync_finished = threading.Event(), threading.Event(), threading.Event()
+
+        def slow_sync():
+            sync_started.set()
+            release_sync.wait(5)
+            sync_finished.set()
+            return {'xml_added': 0}
+        service = SyncService(slow_sync, port=0, token_path=str(tmp_path / 'service_token'))
+        thread = threading.Thread(target=service.serve_forever, daemon=True)
+        thread.start()
+        while not os.path.exists(service.token_path):
+            time.sleep(0.01)
+
+        threading.Thread(target=send_command, args=('sync', service.token_path, 10), daemon=True).start()
+        sync_started.wait(5)
+        assert send_command('stop', service.token_path, timeout=5) == {'ok': True}
+        thread.join(timeout=0.3)
+        assert thread.is_alive()
+
+        release_sync.set()
+        thread.join(timeout=5)
+        assert not thread.is_alive() and sync_finished.is_set()
+
+    def test_client_needs_only_the_standard_library(self):
+        """Test that the thin client finds the token without importing the application."""
+        src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+        loaded = subprocess.run(
+            [sys.executable, '-c', 'import sys, sync_service; '
+             'print(sorted(name for name in sys.modules if name.split(".")[0] in '
+             '("appdirs", "snapshot_manager", "google_event", "googleapiclient", "PyQt5")))'],
+            cwd=src_dir, capture_output=True, text=True, check=True).stdout
+        assert loaded.strip() == '[]'
+        assert os.path.dirname(TOKEN_FILE) == appdirs.user_data_dir('CalendarSync', roaming=True)
+
+    @pytest.mark.skipif(os.name == 'nt', reason="POSIX permissions")
+    def test_token_file_is_private(self, running_service):
+        """Test that only the user can read the token file."""
+        service, _ = running_service
+        assert os.stat(service.token_path).st_mode & 0o777 == 0o600
+
+    @pytest.mark.parametrize('error', [RefreshError("token revoked"), TimeoutError("timed out")])
+    @patch('src.main.needs_backfill', return_value=False)
+    @patch('src.main.run_single_flight', side_effect=lambda sync_function, fingerprint: sync_function())
+    @patch('src.main.sync_calendar_with_diff')
+    def test_failed_sync_resets_the_google_service(self, mock_sync, mock_run, mock_needs_backfill,
+                                                   error, monkeypatch):
+        """Test that the resident process authenticates and connects again after a failure."""
+        from src.main import main
+        monkeypatch.setattr(auth, '_service', object())
+        mock_sync.side_effect = error
+
+        with pytest.raises(type(error)):
+            main(progressive=False)
+
+        assert auth._service is None
+
+    def test_requests_need_the_token(self, running_service):
+        """Test that other local programs cannot drive the service."""
+        service, _ = running_service
+        assert service.handle({'command': 'sync', 'token': 'guess'}) == {'ok': False, 'error': 'invalid token'}
+        assert service.sync_count == 0
+
+    def test_snapshots_stay_loaded_between_syncs(self, tmp_path):
+        """Test that unchanged snapshot files are not parsed again."""
+        with patch.object(snapshot_manager, 'SNAPSHOT_DIR', str(tmp_path)), \
+             patch.object(snapshot_manager, 'GOOGLE_SNAPSHOT_FILE', str(tmp_path / 'google.json')), \
+             patch.object(snapshot_manager, 'XML_SNAPSHOT_FILE', str(tmp_path / 'xml.json')):
+            snapshot_manager.save_snapshots([GoogleEvent('g1', 'Kiné')], [])
+            with patch('snapshot_manager.json.load') as mock_load:
+                google_events, _ = snapshot_manager.load_snapshots()
+            mock_load.assert_not_called()
+            assert google_events == [GoogleEvent('g1', 'Kiné')]